@@ -0,0 +1,239 @@
+import pandas as pd
+
+from database import DAILY_COLUMNS, POLLUTANT_COLUMNS
+
+# Days of history the Home page shows, enough for the 7-day baseline of every selectable day
+HISTORY_DAYS = 10
+# Pollutants charted for each day, on the Home page and in the static snapshot
+PLOT_METRICS = ('AQI', 'PM10', 'O3', 'PM2_5')
+
+
+def daily_rollup(df):
+    """
+    Compute the AIR_QUALITY_DAILY rollup from hourly rows in one groupby.
+
+    Used when the materialized table is unavailable, and by the local
+    backends, so every view reads the same daily shape.
+
+    Parameters:
+        df (pandas.DataFrame): Latest record per LOCATION and DATE, with DATE and the pollutant columns.
+
+    Returns:
+        daily (pandas.DataFrame): One row per location and day, columns as in DAILY_COLUMNS.
+    """
+    pollutants = [p for p in POLLUTANT_COLUMNS if p in df]
+    aggregations = {'HOURS': ('DATE', 'size')}
+    if 'LOCATION' in df:
+        keys = ['LOCATION']
+        for coordinate in ('LON', 'LAT'):
+            if coordinate in df:
+                aggregations[coordinate] = (coordinate, 'first')
+    else:
+        keys = [key for key in ('LON', 'LAT') if key in df]
+    for pollutant in pollutants:
+        aggregations[f'{pollutant}_MEAN'] = (pollutant, 'mean')
+        aggregations[f'{pollutant}_MAX'] = (pollutant, 'max')
+    daily = (
+        df.assign(DAY=pd.to_datetime(df['DATE']).dt.normalize())
+        .groupby(keys + ['DAY'], sort=True, observed=True)
+        .agg(**aggregations)
+        .reset_index()
+        .sort_values(['DAY'] + keys, ignore_index=True)
+    )
+    return daily[[column for column in DAILY_COLUMNS if column in daily]]
+
+
+def summary_table(daily, metrics=('AQI', 'O3', 'PM10', 'PM2_5'), days=5):
+    """
+    Daily means of the most recent days, one column per day.
+
+    Parameters:
+        daily (pandas.DataFrame): Daily rollup of one location, as returned by daily_rollup() or fetch_daily().
+        metrics (tuple): Pollutants to show, in row order.
+        days (int): Number of most recent days to keep.
+
+    Returns:
+        summary_df (pandas.DataFrame): Metrics as rows and (Day, Date) columns, oldest day first.
+    """
+    recent = daily.sort_values('DAY').tail(days)
+    summary_df = recent[[f'{metric}_MEAN' for metric in metrics]].set_axis(list(metrics), axis=1)
+    summary_df.index = pd.MultiIndex.from_arrays(
+        [recent['DAY'].dt.strftime('%A'), recent['DAY'].dt.strftime('%m/%d/%Y')], names=['Day', 'Date']
+    )
+    return summary_df.transpose()
+
+
+def worst_days(daily, start, days=5, metrics=('AQI', 'PM10', 'O3', 'PM2_5')):
+    """
+    Day with the highest daily mean of each pollutant within a range.
+
+    Parameters:
+        daily (pandas.DataFrame): Daily rollup of one location.
+        start (date): First day considered.
+        days (int): Number of days considered from `start`.
+        metrics (tuple): Pollutants to rank.
+
+    Returns:
+        pandas.Series: Worst day (Timestamp) per metric, NaT for a metric without values
+            and empty when no day of the range has been forecast.
+    """
+    start = pd.Timestamp(start)
+    upcoming = daily[(daily['DAY'] >= start) & (daily['DAY'] < start + pd.Timedelta(days=days))]
+    means = upcoming.set_index('DAY')[[f'{metric}_MEAN' for metric in metrics]].set_axis(list(metrics), axis=1)
+    # idxmax raises on a column without any value, which is every column of a location no longer forecast
+    means = means.dropna(axis=1, how='all')
+    if means.empty:
+        return pd.Series(dtype='datetime64[ns]')
+    return means.idxmax().reindex(list(metrics))
+
+
+def location_comparison(daily, metric='AQI', days=5):
+    """
+    Daily means of one pollutant at every location, one column per day.
+
+    A single pivot of the daily rollup, so the cost follows the number of rows
+    and not the number of locations.
+
+    Parameters:
+        daily (pandas.DataFrame): Daily rollup of any number of locations.
+        metric (str): Pollutant to compare.
+        days (int): Number of most recent days to keep.
+
+    Returns:
+        comparison (pandas.DataFrame): Locations as rows, worst average first, with one
+            column per day and an 'Average' column.
+    """
+    recent_days = daily['DAY'].drop_duplicates().nlargest(days)
+    recent = daily[daily['DAY'].isin(recent_days)]
+    comparison = recent.pivot_table(
+        index='LOCATION', columns='DAY', values=f'{metric}_MEAN', aggfunc='mean', observed=True
+    ).sort_index(axis=1)
+    comparison.columns = comparison.columns.strftime('%a %m/%d')
+    comparison['Average'] = comparison.mean(axis=1)
+    comparison.index = comparison.index.astype(str)
+    return comparison.sort_values('Average', ascending=False).rename_axis('Location').rename_axis(None, axis=1)
+
+
+class DayIndex:
+    """
+    Hourly rows indexed once by day, with per-day means and 7-day baselines precomputed.
+
+    Selecting a day is a slice of a sorted DatetimeIndex, and the baseline of
+    every metric is a lookup, so neither depends on how much history is loaded.
+
+    Parameters:
+        df (pandas.DataFrame): Latest record per DATE of one location, with the metric columns.
+        metrics (list): Columns to index.
+        baseline_days (int): Length of the trailing window preceding each day.
+    """
+
+    def __init__(self, df, metrics, baseline_days=7):
+        self.metrics = list(metrics)
+        hourly = df[['DATE'] + self.metrics].copy()
+        hourly['DATE'] = pd.to_datetime(hourly['DATE'])
+        hourly['HOUR'] = hourly['DATE'].dt.hour
+        self.hourly = hourly.set_index('DATE').sort_index()
+
+        # Accumulate in float64, the frame stores float32/int8 columns
+        grouped = self.hourly[self.metrics].astype('float64').groupby(self.hourly.index.normalize())
+        sums, counts = grouped.sum(), grouped.count()
+        self.days = sums.index
+        self.day_means = sums / counts
+
+        # Sum and count over the `baseline_days` days before each day, calendar gaps included
+        if len(sums):
+            calendar = pd.date_range(sums.index.min(), sums.index.max(), freq='D')
+            window_sums = sums.reindex(calendar, fill_value=0).rolling(baseline_days, min_periods=1).sum().shift(1)
+            window_counts = counts.reindex(calendar, fill_value=0).rolling(baseline_days, min_periods=1).sum().shift(1)
+            self.baseline = (window_sums / window_counts.where(window_counts > 0)).reindex(self.days)
+        else:
+            self.baseline = self.day_means.copy()
+
+    def recent_days(self, count=5):
+        """The `count` most recent days, newest first."""
+        return list(self.days[::-1][:count])
+
+    def day(self, day):
+        """Hourly rows of one day."""
+        day = pd.Timestamp(day).normalize()
+        return self.hourly.loc[day:day + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)]
+
+    def day_mean(self, day, metric):
+        return self.day_means.at[pd.Timestamp(day).normalize(), metric]
+
+    def baseline_mean(self, day, metric):
+        return self.baseline.at[pd.Timestamp(day).normalize(), metric]
+
+
+class TrendIndex:
+    """
+    Long-range statistics of one location's history, computed once per data version.
+
+    Every statistic is computed for all pollutants in one grouped pass, so
+    switching pollutant on the page is a column lookup.
+
+    Parameters:
+        hourly (pandas.DataFrame): Latest record per DATE of one location, with the metric columns.
+        daily (pandas.DataFrame): Daily rollup of the same location.
+        metrics (list): Pollutants to index.
+        windows (tuple): Rolling window lengths, in days.
+        percentiles (tuple): Quantiles of the hourly values reported per month.
+    """
+
+    def __init__(self, hourly, daily, metrics, windows=(30, 90), percentiles=(0.5, 0.9, 0.99)):
+        self.metrics = list(metrics)
+        self.windows = list(windows)
+
+        # Daily means indexed by day; time-based windows span calendar days, gaps included
+        means = daily.set_index('DAY').sort_index()[[f'{metric}_MEAN' for metric in self.metrics]]
+        self.daily_means = means.set_axis(self.metrics, axis=1).astype('float64')
+        self.rolling = {
+            window: self.daily_means.rolling(f'{window}D', min_periods=max(1, window // 2)).mean()
+            for window in self.windows
+        }
+
+        # Accumulate in float64, the frame stores float32/int8 columns
+        values = hourly[self.metrics].astype('float64')
+        dates = pd.to_datetime(hourly['DATE'])
+        self.monthly_percentiles = values.groupby(dates.dt.to_period('M').rename('MONTH')).quantile(list(percentiles))
+        self.hour_by_month = values.groupby([dates.dt.hour.rename('HOUR'), dates.dt.month.rename('MONTH')]).mean()
+
+    def rolling_means(self, metric):
+        """Daily mean of a metric and its rolling means, one column per window."""
+        columns = {'Daily mean': self.daily_means[metric]}
+        for window in self.windows:
+            columns[f'{window}-day mean'] = self.rolling[window][metric]
+        return pd.DataFrame(columns)
+
+    def percentiles(self, metric):
+        """Hourly percentiles of a metric per calendar month, newest month first."""
+        table = self.monthly_percentiles[metric].unstack()
+        table.columns = [f'P{quantile * 100:g}' for quantile in table.columns]
+        table.index = table.index.strftime('%Y-%m')
+        return table.iloc[::-1]
+
+    def heatmap(self, metric):
+        """Mean of a metric per hour of the day (rows) and month of the year (columns)."""
+        return self.hour_by_month[metric].unstack('MONTH')
+
+
+def accuracy_by_lead_day(accuracy, metrics):
+    """
+    Roll the per-lead-hour forecast errors up to whole days of lead time.
+
+    Parameters:
+        accuracy (pandas.DataFrame): Output of fetch_forecast_accuracy().
+        metrics (list): Pollutants to keep.
+
+    Returns:
+        pandas.DataFrame: PAIRS and {metric}_MAE / {metric}_BIAS indexed by LEAD_DAYS,
+            each error weighted by the number of pairs of its lead hour.
+    """
+    columns = [f'{metric}_{stat}' for metric in metrics for stat in ('MAE', 'BIAS')]
+    lead_days = (accuracy['LEAD_HOURS'] // 24).rename('LEAD_DAYS')
+    pairs = accuracy['PAIRS'].astype('float64')
+    weighted = accuracy[columns].astype('float64').mul(pairs, axis=0).groupby(lead_days).sum()
+    totals = pairs.groupby(lead_days).sum()
+    by_day = weighted.div(totals, axis=0)
+    by_day.insert(0, 'PAIRS', totals.astype('int64'))
+    return by_day
@@ -0,0 +1,104 @@
+"""
+Time the dashboard queries on a table full of superseded forecasts, then again
+after `etl.migrate` (location key and clustering) and `etl.compact` (archiving).
+
+Usage:
+    python -m benchmarks.bench_compaction --days 1095 --locations 4 --reforecasts 4
+"""
+import argparse
+import json
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from aggregations import HISTORY_DAYS
+from benchmarks.synthetic import generate_history, load_duckdb, load_sqlite
+from benchmarks.timing import check, measure, summarize
+from data_access import DASHBOARD_COLUMNS
+from database import AIR_QUALITY_TABLE, DUCKDB, SQLITE, fetch_data, fetch_load_stats
+from etl import compact, migrate
+
+
+
+def row_count(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {AIR_QUALITY_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def dashboard_queries(conn, dialect, repeat):
+    """
+    Time what the pages ask for: the Home.py window and the Metadata.py aggregate.
+
+    Returns:
+        (dict, pandas.DataFrame, pandas.DataFrame): Timings per query and the number of rows
+            in the table, then both query results.
+    """
+    start = date.today() - timedelta(days=HISTORY_DAYS)
+    window = measure(lambda: fetch_data(conn, start=start, columns=list(DASHBOARD_COLUMNS), dialect=dialect), repeat=repeat)
+    stats = measure(lambda: fetch_load_stats(conn, dialect), repeat=repeat)
+    check(len(window['result']) > 0, f"{dialect.name}: the window query returned no rows")
+    check(len(stats['result']) > 0, f"{dialect.name}: the load statistics query returned no rows")
+    timings = {'table_rows': row_count(conn), 'window': summarize(window), 'load_stats': summarize(stats)}
+    return timings, window['result'], stats['result']
+
+
+def run(days=1095, locations=4, reforecasts=4, repeat=5):
+    """
+    Run the compaction benchmark against SQLite and, when installed, DuckDB.
+
+    Parameters:
+        days (int): Days of synthetic history.
+        locations (int): Number of locations.
+        reforecasts (int): Forecast versions per DATE and location.
+        repeat (int): Timed repetitions per query.
+
+    Returns:
+        dict: Query timings before and after, and the cost of the one-off migration and compaction.
+    """
+    history = generate_history(days=days, locations=locations, reforecasts=reforecasts)
+    backends = [('sqlite', load_sqlite(history, sqlite3.connect(':memory:')), SQLITE)]
+    try:
+        import duckdb
+        backends.append(('duckdb', load_duckdb(history, duckdb.connect()), DUCKDB))
+    except ImportError:
+        pass
+
+    results = {'locations': locations, 'reforecasts': reforecasts, 'backends': {}}
+    for name, conn, dialect in backends:
+        before, window_before, stats_before = dashboard_queries(conn, dialect, repeat)
+        began = time.perf_counter()
+        migrate(conn, dialect)
+        migrate_s = time.perf_counter() - began
+        began = time.perf_counter()
+        archived = compact(conn, dialect)['archived']
+        compact_s = time.perf_counter() - began
+        after, window_after, stats_after = dashboard_queries(conn, dialect, repeat)
+        # Compaction only moves superseded versions, what the pages read must not change
+        check(window_before.equals(window_after), f"{name}: the window changed after compaction")
+        check(stats_before['FORECAST_ROWS'].tolist() == stats_after['FORECAST_ROWS'].tolist(),
+              f"{name}: the load statistics changed after compaction")
+        results['backends'][name] = {
+            'before': before,
+            'migrate_s': round(migrate_s, 4),
+            'compact_s': round(compact_s, 4),
+            'archived_rows': archived,
+            'after': after,
+            'window_speedup': round(before['window']['median_s'] / after['window']['median_s'], 1),
+            'load_stats_speedup': round(before['load_stats']['median_s'] / after['load_stats']['median_s'], 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--locations', type=int, default=4)
+    parser.add_argument('--reforecasts', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.locations, args.reforecasts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
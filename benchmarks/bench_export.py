@@ -0,0 +1,99 @@
+"""
+Time the static snapshot export against rendering Home.py live.
+
+Compares what one visit to a location costs when the page is rendered from
+the database (hourly window query, day index and today's charts) against
+reading the page pre-rendered by the export, and times the export itself.
+
+Usage:
+    python -m benchmarks.bench_export --locations 10 --days 30
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+
+from aggregations import HISTORY_DAYS, PLOT_METRICS, DayIndex
+from benchmarks.synthetic import generate_history, load_sqlite, location_name
+from benchmarks.timing import check, measure, summarize
+from database import SQLITE, fetch_data
+from etl import migrate
+from export import export_snapshot, read_manifest
+from figures import build_metric_figure
+
+
+def live_visit(conn, start, location):
+    """The queries and figures of one cold visit to a location's Home page."""
+    hourly = fetch_data(
+        conn, start=start, columns=['LOCATION', 'DATE', 'RECORD_TIMESTAMP'] + list(PLOT_METRICS),
+        dialect=SQLITE, locations=[location]
+    )
+    day_index = DayIndex(hourly, PLOT_METRICS)
+    day = day_index.recent_days(1)[0]
+    return [build_metric_figure(day_index.day(day), metric) for metric in PLOT_METRICS]
+
+
+def snapshot_visit(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def artifact_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def run(days=30, locations=10, reforecasts=2, repeat=5):
+    """
+    Run the export benchmark against SQLite.
+
+    Parameters:
+        days (int): Days of synthetic history.
+        locations (int): Number of locations.
+        reforecasts (int): Forecast versions per DATE and location.
+        repeat (int): Timed repetitions.
+
+    Returns:
+        dict: Timings of the export, of a live visit and of a snapshot visit, and the snapshot size.
+    """
+    history = generate_history(days=days, locations=locations, reforecasts=reforecasts)
+    conn = load_sqlite(history, sqlite3.connect(':memory:'))
+    migrate(conn, SQLITE)
+    start = date.today() - timedelta(days=HISTORY_DAYS)
+    location = location_name(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, 'snapshot')
+        export = measure(lambda: export_snapshot(conn, SQLITE, output_dir), repeat=repeat)
+        manifest = read_manifest(output_dir)
+        page = os.path.join(output_dir, next(entry['page'] for entry in manifest['locations'] if entry['name'] == location))
+        check(len(manifest['locations']) == locations, "the snapshot does not hold every location")
+        live = measure(lambda: live_visit(conn, start, location), repeat=repeat)
+        check(len(live['result']) == len(PLOT_METRICS), "the live visit built no charts")
+        snapshot = measure(lambda: snapshot_visit(page), repeat=repeat)
+        return {
+            'locations': len(manifest['locations']),
+            'rows': len(history),
+            'export': summarize(export),
+            'export_per_location_s': round(export['median_s'] / len(manifest['locations']), 4),
+            'snapshot_bytes': artifact_bytes(output_dir),
+            'page_bytes': os.path.getsize(page),
+            'visit_live': summarize(live),
+            'visit_snapshot': summarize(snapshot),
+            'visit_speedup': round(live['median_s'] / snapshot['median_s'], 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--locations', type=int, default=10)
+    parser.add_argument('--reforecasts', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.locations, args.reforecasts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure extraction throughput (locations/sec) against the local fake OpenWeatherMap server.
+
+Each worker count starts from an empty geocode cache; a final warm run reuses
+the cache of the last one and should make no geocoding calls.
+
+Usage:
+    python -m benchmarks.bench_extract --locations 48 --latency-ms 50 --workers 1 8 16
+"""
+import argparse
+import json
+import time
+
+from benchmarks.fake_owm import serve
+from benchmarks.timing import check
+from openweathermap import GeocodeCache, Location, OpenWeatherMapClient, extract_locations, make_session
+
+
+def synthetic_locations(count):
+    return [Location(f'Location {i:03d}', None, f'85{i:03d},US') for i in range(count)]
+
+
+def run(locations=48, latency_ms=50, workers=(1, 8, 16), rate_limit_every=0):
+    """
+    Extract the same location list with different worker counts.
+
+    Parameters:
+        locations (int): Number of synthetic zip-code locations.
+        latency_ms (float): Simulated API latency per call.
+        workers (iterable): Worker counts to compare.
+        rate_limit_every (int): Answer every Nth call with 429.
+
+    Returns:
+        dict: Throughput, API calls and failures per worker count.
+    """
+    results = {'locations': locations, 'latency_ms': latency_ms, 'runs': {}}
+    cache = None
+    for run_name, max_workers in [(str(count), count) for count in workers] + [('warm', max(workers))]:
+        if run_name != 'warm':
+            cache = GeocodeCache(path=None)
+        cache.hits = cache.misses = 0
+        with serve(latency_ms, rate_limit_every) as server:
+            client = OpenWeatherMapClient(
+                api_key='benchmark', session=make_session(pool_size=max_workers, backoff_factor=0),
+                base_url=server.base_url, geocode_cache=cache
+            )
+            start = time.perf_counter()
+            extracted, errors = extract_locations(synthetic_locations(locations), client, max_workers)
+            elapsed = time.perf_counter() - start
+            check(len(extracted) > 0, f"no location was extracted with {max_workers} workers")
+            if not rate_limit_every:
+                check(not errors, f"{len(errors)} locations failed with {max_workers} workers")
+            results['runs'][run_name] = {
+                'workers': max_workers,
+                'seconds': round(elapsed, 4),
+                'locations_per_s': round(len(extracted) / elapsed, 2),
+                'api_calls': client.calls,
+                'geocode_calls': client.geocode_calls,
+                'geocode_hit_rate': round(cache.hit_rate(), 3),
+                'http_requests': server.requests,
+                'rate_limited': server.rate_limited,
+                'failed_locations': len(errors),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=48)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 16])
+    parser.add_argument('--rate-limit-every', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.locations, args.latency_ms, args.workers, args.rate_limit_every), indent=2))
+
+
+if __name__ == '__main__':
+    main()
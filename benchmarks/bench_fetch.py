@@ -0,0 +1,131 @@
+"""
+Compare the legacy `SELECT *` + pandas deduplication with the pushed-down query,
+a full window fetch with an incremental snapshot refresh after one ETL batch,
+and the in-memory size of the full history with and without compact dtypes.
+
+Usage:
+    python -m benchmarks.bench_fetch --days 1095 --reforecasts 4
+"""
+import argparse
+import functools
+import json
+import sqlite3
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from aggregations import HISTORY_DAYS
+from benchmarks.synthetic import generate_batch, generate_history, load_duckdb, load_sqlite
+from benchmarks.timing import check, measure, summarize
+from data_access import DASHBOARD_COLUMNS
+from database import DUCKDB, SQLITE, AirQualitySnapshot, fetch_data
+
+
+
+def legacy_fetch(conn):
+    """The original fetch_data: pull every row, deduplicate and filter in pandas."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM AIR_QUALITY_DATA")
+    rows = cursor.fetchall()
+    df = pd.DataFrame(rows, columns=[x[0] for x in cursor.description])
+    df = df.sort_values('RECORD_TIMESTAMP', ascending=False)
+    df = df.drop_duplicates(subset=['DATE'], keep='first')
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    return df[df['DATE'] >= pd.Timestamp(date.today() - timedelta(days=HISTORY_DAYS))]
+
+
+def frame_sizes(conn, dialect):
+    """
+    Deep memory usage of the deduplicated full history in each representation.
+
+    Returns:
+        dict: Bytes for the fetchall() frame, the compact frame, and the Home.py projection.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM AIR_QUALITY_DATA")
+    legacy = pd.DataFrame(cursor.fetchall(), columns=[x[0] for x in cursor.description])
+    legacy = legacy.sort_values('RECORD_TIMESTAMP', ascending=False).drop_duplicates(subset=['DATE'])
+    compact = fetch_data(conn, dialect=dialect)
+    projected = fetch_data(conn, columns=list(DASHBOARD_COLUMNS), dialect=dialect)
+    check(len(compact) == len(legacy) == len(projected), f"{dialect.name}: frames of the full history differ in length")
+    return {
+        'legacy_bytes': int(legacy.memory_usage(deep=True).sum()),
+        'compact_bytes': int(compact.memory_usage(deep=True).sum()),
+        'projected_bytes': int(projected.memory_usage(deep=True).sum()),
+    }
+
+
+def incremental_refresh(conn, loader, dialect, start, repeat):
+    """
+    Time snapshot refreshes, each after one new ETL batch has been loaded.
+
+    Returns:
+        dict: Timing figures and the number of rows fetched per refresh.
+    """
+    fetch = functools.partial(fetch_data, dialect=dialect)
+    snapshot = AirQualitySnapshot()
+    snapshot.refresh(conn, start, fetch=fetch)
+    timings = []
+    for i in range(repeat):
+        loader(generate_batch(pd.Timestamp.now().floor('s') + pd.Timedelta(minutes=i + 1), seed=i), conn)
+        began = time.perf_counter()
+        df = snapshot.refresh(conn, start, fetch=fetch)
+        timings.append(time.perf_counter() - began)
+    # The refreshed snapshot must hold exactly what a full fetch returns
+    full = fetch(conn, start=start)
+    check(len(df) == len(full) and df['RECORD_TIMESTAMP'].max() == full['RECORD_TIMESTAMP'].max(),
+          f"{dialect.name}: incremental refresh diverged from a full fetch")
+    return {'best_s': round(min(timings), 6), 'median_s': round(sorted(timings)[len(timings) // 2], 6)}
+
+
+def run(days=1095, reforecasts=4, repeat=5):
+    """
+    Run the fetch benchmark against SQLite and, when installed, DuckDB.
+
+    Parameters:
+        days (int): Days of synthetic history.
+        reforecasts (int): Forecast versions per DATE.
+        repeat (int): Timed repetitions per case.
+
+    Returns:
+        dict: Timings per backend and strategy.
+    """
+    history = generate_history(days=days, reforecasts=reforecasts)
+    start = date.today() - timedelta(days=HISTORY_DAYS)
+    backends = [('sqlite', load_sqlite(history, sqlite3.connect(':memory:')), load_sqlite, SQLITE)]
+    try:
+        import duckdb
+        backends.append(('duckdb', load_duckdb(history, duckdb.connect()), load_duckdb, DUCKDB))
+    except ImportError:
+        pass
+
+    results = {'table_rows': len(history), 'backends': {}}
+    for name, conn, loader, dialect in backends:
+        legacy = measure(lambda: legacy_fetch(conn), repeat=repeat)
+        pushed = measure(lambda: fetch_data(conn, start=start, dialect=dialect), repeat=repeat)
+        # Both paths must agree before their timings mean anything
+        expected = legacy['result'].sort_values('DATE')
+        check(len(expected) > 0, f"{name}: the window is empty")
+        check(expected['AQI'].tolist() == pushed['result']['AQI'].tolist(), f"{name}: pushdown and legacy windows differ")
+        results['backends'][name] = {
+            'legacy': {**summarize(legacy), 'rows': len(legacy['result'])},
+            'pushdown': {**summarize(pushed), 'rows': len(pushed['result'])},
+            'speedup': round(legacy['median_s'] / pushed['median_s'], 1),
+            'incremental_refresh': incremental_refresh(conn, loader, dialect, start, repeat),
+            'memory': frame_sizes(conn, dialect),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--reforecasts', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.reforecasts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Render time per day view: rebuilding the four Plotly figures on every rerun
+versus the FigureCache keyed on (day, metric, data version).
+
+Usage:
+    python -m benchmarks.bench_figures --days 365
+"""
+import argparse
+import json
+
+import pandas as pd
+
+from aggregations import DayIndex
+from benchmarks.bench_plot_prep import METRICS, legacy_prep
+from benchmarks.synthetic import generate_history
+from benchmarks.timing import check, measure, summarize
+from figures import FigureCache, build_metric_figure
+
+
+def legacy_view(df, day):
+    df_plot, _ = legacy_prep(df, day)
+    return [build_metric_figure(df_plot, metric) for metric in METRICS]
+
+
+def cached_view(cache, day_index, day, data_version):
+    return [
+        cache.get_or_build((day, metric, data_version), lambda: build_metric_figure(day_index.day(day), metric))
+        for metric in METRICS
+    ]
+
+
+def run(days=365, repeat=5):
+    """
+    Time one day view uncached, on a cold cache and on a warm cache.
+
+    Parameters:
+        days (int): Days of history in the frame.
+        repeat (int): Timed repetitions.
+
+    Returns:
+        dict: Seconds per view for each case.
+    """
+    history = generate_history(days=days)
+    df = history.sort_values('RECORD_TIMESTAMP', ascending=False).drop_duplicates('DATE').sort_values('DATE')
+    data_version = df['RECORD_TIMESTAMP'].max()
+    day = pd.Timestamp.today().normalize()
+    day_index = DayIndex(df, METRICS)
+
+    uncached = measure(lambda: legacy_view(df, day), repeat=repeat)
+    cold = measure(lambda: cached_view(FigureCache(), day_index, day, data_version), repeat=repeat)
+    warm_cache = FigureCache()
+    warm = measure(lambda: cached_view(warm_cache, day_index, day, data_version), repeat=repeat)
+    # Same bars whichever path built them
+    for old, new in zip(uncached['result'], warm['result']):
+        check(len(new.data) > 0 and sum(len(trace.y) for trace in new.data) > 0, "a cached figure has no data")
+        check([list(trace.y) for trace in old.data] == [list(trace.y) for trace in new.data], "cached and uncached figures differ")
+
+    return {
+        'rows': len(df),
+        'figures_per_view': len(METRICS),
+        'uncached_view': summarize(uncached),
+        'cold_cache_view': summarize(cold),
+        'warm_cache_view': summarize(warm),
+        'repeat_view_speedup': round(uncached['median_s'] / warm['median_s'], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
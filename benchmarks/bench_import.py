@@ -0,0 +1,139 @@
+"""
+Measure the cold-start import cost of the app and ETL entry points with `python -X importtime`.
+
+Each entry point is imported in a fresh interpreter, so the numbers are what
+a new Streamlit worker or a scheduled ETL run pays before doing any work.
+Pass a git ref as --baseline to measure the same entry points at that commit.
+
+Usage:
+    python -m benchmarks.bench_import --repeat 5 --baseline HEAD~1
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from benchmarks.timing import check
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point -> statement importing it, run from the project directory
+ENTRY_POINTS = {
+    'home': "import Home",
+    'metadata': "import sys; sys.path.insert(0, 'pages'); import Metadata",
+    'etl': "import etl",
+}
+
+# Libraries whose presence at import time is reported. Streamlit itself imports
+# plotly.graph_objects, what the app can defer is plotly.express on top of it.
+HEAVY_MODULES = ['plotly.express', 'snowflake.connector', 'seaborn', 'duckdb']
+
+
+def parse_importtime(stderr):
+    """
+    Read the `-X importtime` report.
+
+    Returns:
+        (float, dict, set): Total import time in ms, the cumulative ms of each module the
+            entry point imports directly, and the names of every module imported.
+    """
+    total, children, pending, modules = 0.0, {}, {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        name = name.strip()
+        modules.add(name)
+        # A module's line follows those of the modules it imported, one indent deeper
+        if depth == 1:
+            pending[name] = int(cumulative) / 1000
+        elif depth == 0:
+            total += int(cumulative) / 1000
+            # The entry point is imported last, after site and the interpreter's own modules
+            children, pending = pending, {}
+    return total, children, modules
+
+
+def measure_imports(statement, cwd, repeat=5):
+    """
+    Import an entry point in `repeat` fresh interpreters.
+
+    Returns:
+        dict: Median import and process times in ms, the slowest direct imports of the entry point,
+            and which heavy libraries loaded.
+    """
+    totals, walls = [], []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', statement],
+            cwd=cwd, capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+        )
+        walls.append((time.perf_counter() - began) * 1000)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{statement!r} failed: {completed.stderr[-2000:]}")
+        total, children, modules = parse_importtime(completed.stderr)
+        check(children, f"{statement!r}: no import of the entry point found in the -X importtime report")
+        totals.append(total)
+    slowest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:8]
+    return {
+        'import_ms': round(statistics.median(totals), 1),
+        'process_ms': round(statistics.median(walls), 1),
+        'slowest_imports_ms': {name: round(ms, 1) for name, ms in slowest},
+        'loaded': {module: module in modules for module in HEAVY_MODULES},
+    }
+
+
+def checkout(ref, directory):
+    """Extract the tree of a git ref into a directory."""
+    archive = os.path.join(directory, 'tree.tar')
+    with open(archive, 'wb') as f:
+        subprocess.run(['git', 'archive', ref], cwd=PROJECT_DIR, stdout=f, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(directory)
+    os.remove(archive)
+    # The untracked .env holds the credentials every entry point loads
+    if os.path.exists(os.path.join(PROJECT_DIR, '.env')):
+        with open(os.path.join(PROJECT_DIR, '.env')) as src, open(os.path.join(directory, '.env'), 'w') as dst:
+            dst.write(src.read())
+
+
+def run(repeat=5, baseline=None):
+    """
+    Measure each entry point in the working tree and, optionally, at a baseline commit.
+
+    Parameters:
+        repeat (int): Fresh interpreters per entry point.
+        baseline (str or None): Git ref to compare against.
+
+    Returns:
+        dict: Measurements per entry point, with the baseline and the saving when requested.
+    """
+    results = {name: {'current': measure_imports(statement, PROJECT_DIR, repeat)} for name, statement in ENTRY_POINTS.items()}
+    if baseline:
+        with tempfile.TemporaryDirectory() as directory:
+            checkout(baseline, directory)
+            for name, statement in ENTRY_POINTS.items():
+                before = measure_imports(statement, directory, repeat)
+                results[name]['baseline'] = before
+                results[name]['saved_ms'] = round(before['import_ms'] - results[name]['current']['import_ms'], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', help="Git ref to measure as well, e.g. HEAD~1")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.baseline), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Compare the legacy row-at-a-time forecast insert with the batched upsert in etl.py.
+
+A round-trip delay can be added to every statement to mimic the network hop to
+Snowflake, which is what the batched path saves.
+
+Usage:
+    python -m benchmarks.bench_load --round-trip-ms 20
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.timing import check, measure, summarize
+from database import AIR_QUALITY_TABLE, SQLITE
+from etl import create_tables, load_air_quality, transform_air_quality
+
+SAMPLE_PAYLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'pollen_data.json')
+
+
+class RoundTripConnection:
+    """Wrap a DB-API connection so every statement sleeps for a fixed round trip."""
+
+    def __init__(self, conn, round_trip_s):
+        self._conn = conn
+        self._round_trip_s = round_trip_s
+
+    def cursor(self):
+        return RoundTripCursor(self._conn.cursor(), self._round_trip_s)
+
+    def commit(self):
+        time.sleep(self._round_trip_s)
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+
+class RoundTripCursor:
+    def __init__(self, cursor, round_trip_s):
+        self._cursor = cursor
+        self._round_trip_s = round_trip_s
+
+    def execute(self, *args):
+        time.sleep(self._round_trip_s)
+        return self._cursor.execute(*args)
+
+    def executemany(self, *args):
+        time.sleep(self._round_trip_s)
+        return self._cursor.executemany(*args)
+
+
+def legacy_load(conn, data2):
+    """The original loop: one INSERT and one datetime.now() per forecast entry."""
+    cur = conn.cursor()
+    for forecast in data2['list']:
+        air_quality_data = [
+            data2['coord']['lon'],
+            data2['coord']['lat'],
+            pd.to_datetime(forecast['dt'], unit='s').strftime('%Y-%m-%d %H:%M:%S'),
+            forecast['main']['aqi'],
+            forecast['components']['co'],
+            forecast['components']['no'],
+            forecast['components']['no2'],
+            forecast['components']['o3'],
+            forecast['components']['so2'],
+            forecast['components']['pm2_5'],
+            forecast['components']['pm10'],
+            forecast['components']['nh3'],
+        ]
+        air_quality_data.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
+        cur.execute("""
+            INSERT INTO AIR_QUALITY_DATA (
+                LON, LAT, DATE, AQI, CO, NO, NO2, O3, SO2, PM2_5, PM10, NH3, RECORD_TIMESTAMP
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(air_quality_data))
+    conn.commit()
+
+
+def batched_load(conn, data2):
+    run_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+    load_air_quality(conn, transform_air_quality(data2, run_timestamp), dialect=SQLITE)
+
+
+def row_count(conn):
+    return conn.execute(f"SELECT COUNT(*) FROM {AIR_QUALITY_TABLE}").fetchone()[0]
+
+
+def run(round_trip_ms=20, runs=3):
+    """
+    Load the sample forecast payload `runs` times with each strategy.
+
+    Parameters:
+        round_trip_ms (float): Simulated latency per statement.
+        runs (int): Number of ETL runs to replay.
+
+    Returns:
+        dict: Timings and the table size each strategy leaves behind.
+    """
+    with open(SAMPLE_PAYLOAD) as f:
+        data2 = json.load(f)
+
+    results = {'rows_per_run': len(data2['list']), 'round_trip_ms': round_trip_ms}
+    for name, load in (('legacy', legacy_load), ('batched', batched_load)):
+        raw = sqlite3.connect(':memory:')
+        create_tables(raw, SQLITE)
+        conn = RoundTripConnection(raw, round_trip_ms / 1000)
+        timing = measure(lambda: load(conn, data2), repeat=runs, warmup=0)
+        results[name] = {**summarize(timing), 'rows_after_runs': row_count(raw)}
+    # The legacy loop appends every run, the batched load archives what each run supersedes
+    check(results['legacy']['rows_after_runs'] == results['rows_per_run'] * runs, "the legacy load lost rows")
+    check(results['batched']['rows_after_runs'] == results['rows_per_run'], "the batched load must keep one forecast per DATE")
+    results['speedup'] = round(results['legacy']['median_s'] / results['batched']['median_s'], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--round-trip-ms', type=float, default=20)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.round_trip_ms, args.runs), indent=2))
+
+
+if __name__ == '__main__':
+    main()
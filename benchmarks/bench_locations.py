@@ -0,0 +1,104 @@
+"""
+Time the Home.py queries when the table holds many locations.
+
+Compares building the comparison view with one window query per location
+against one query of the daily rollup, and fetching the hourly window of the
+selected location against fetching every location's window.
+
+Usage:
+    python -m benchmarks.bench_locations --locations 120 --days 30
+"""
+import argparse
+import json
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+
+from aggregations import HISTORY_DAYS, daily_rollup, location_comparison
+from benchmarks.synthetic import generate_history, load_duckdb, load_sqlite, location_name
+from benchmarks.timing import check, measure, summarize
+from data_access import DASHBOARD_COLUMNS
+from database import DUCKDB, SQLITE, fetch_daily, fetch_data
+from etl import migrate
+
+
+
+def per_location_comparison(conn, dialect, start, names):
+    """One window query and one rollup per location, then the same comparison."""
+    frames = [
+        daily_rollup(fetch_data(conn, start=start, columns=['LOCATION'] + list(DASHBOARD_COLUMNS), dialect=dialect, locations=[name]))
+        for name in names
+    ]
+    daily = pd.concat(frames, ignore_index=True)
+    return location_comparison(daily)
+
+
+def rollup_comparison(conn, dialect, start):
+    """One query of the daily rollup for every location, pivoted once."""
+    return location_comparison(fetch_daily(conn, start=start, dialect=dialect))
+
+
+def run(days=30, locations=120, reforecasts=2, repeat=5):
+    """
+    Run the location benchmark against SQLite and, when installed, DuckDB.
+
+    Parameters:
+        days (int): Days of synthetic history.
+        locations (int): Number of locations.
+        reforecasts (int): Forecast versions per DATE and location.
+        repeat (int): Timed repetitions per query.
+
+    Returns:
+        dict: Timings of each approach per backend.
+    """
+    history = generate_history(days=days, locations=locations, reforecasts=reforecasts)
+    backends = [('sqlite', load_sqlite(history, sqlite3.connect(':memory:')), SQLITE)]
+    try:
+        import duckdb
+        backends.append(('duckdb', load_duckdb(history, duckdb.connect()), DUCKDB))
+    except ImportError:
+        pass
+
+    start = date.today() - timedelta(days=HISTORY_DAYS)
+    names = [location_name(i) for i in range(locations)]
+    results = {'locations': locations, 'rows': len(history), 'backends': {}}
+    for name, conn, dialect in backends:
+        migrate(conn, dialect)
+        per_location = measure(lambda: per_location_comparison(conn, dialect, start, names), repeat=repeat)
+        rollup = measure(lambda: rollup_comparison(conn, dialect, start), repeat=repeat)
+        # Both paths must agree before their timings mean anything
+        check(len(rollup['result']) == locations, f"{name}: the comparison does not hold every location")
+        check(per_location['result'].round(6).equals(rollup['result'].round(6)), f"{name}: per-location and rollup comparisons differ")
+
+        columns = ['LOCATION'] + list(DASHBOARD_COLUMNS)
+        every_window = measure(lambda: fetch_data(conn, start=start, columns=columns, dialect=dialect), repeat=repeat)
+        one_window = measure(
+            lambda: fetch_data(conn, start=start, columns=columns, dialect=dialect, locations=[names[0]]), repeat=repeat
+        )
+        every = every_window['result']
+        check(len(one_window['result']) > 0, f"{name}: the window of {names[0]} is empty")
+        check(len(one_window['result']) == (every['LOCATION'] == names[0]).sum(), f"{name}: the filtered window lost rows")
+        results['backends'][name] = {
+            'comparison_per_location': summarize(per_location),
+            'comparison_from_rollup': summarize(rollup),
+            'comparison_speedup': round(per_location['median_s'] / rollup['median_s'], 1),
+            'window_every_location': summarize(every_window),
+            'window_one_location': summarize(one_window),
+            'window_speedup': round(every_window['median_s'] / one_window['median_s'], 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--locations', type=int, default=120)
+    parser.add_argument('--reforecasts', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.locations, args.reforecasts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare the data preparation of the original plot_air_quality_metrics with the DayIndex lookups.
+
+Both sides prepare the selected day's rows and the 24-hour and weekly averages
+of all four metrics, without the Streamlit and Plotly calls.
+
+Usage:
+    python -m benchmarks.bench_plot_prep --days 1095
+"""
+import argparse
+import json
+
+import pandas as pd
+
+from aggregations import DayIndex
+from benchmarks.synthetic import generate_history
+from benchmarks.timing import check, measure, summarize
+
+METRICS = ['AQI', 'PM10', 'O3', 'PM2_5']
+
+
+def legacy_prep(df, selected_date):
+    """The pandas work of the original function for one selected day."""
+    df_plot = df.assign(
+        HOUR=lambda df: pd.to_datetime(df['DATE']).dt.hour,
+        DATE=lambda df: pd.to_datetime(df['DATE']).dt.date)
+    df_plot_all = df_plot.copy()
+    sorted(df_plot['DATE'].unique(), reverse=True)[:5]
+    df_plot['DATE'] = pd.to_datetime(df_plot['DATE'])
+    df_plot_all['DATE'] = pd.to_datetime(df_plot_all['DATE'])
+    df_plot = df_plot[df_plot['DATE'].dt.normalize() == selected_date.normalize()]
+    averages = {}
+    for metric in METRICS:
+        weekly_avg = df_plot_all[df_plot_all['DATE'].dt.date.between(
+            (selected_date - pd.DateOffset(weeks=1)).date(), (selected_date - pd.DateOffset(days=1)).date())][metric].mean()
+        averages[metric] = (df_plot[metric].mean(), weekly_avg)
+    return df_plot, averages
+
+
+def indexed_prep(day_index, selected_date):
+    df_plot = day_index.day(selected_date)
+    averages = {
+        metric: (day_index.day_mean(selected_date, metric), day_index.baseline_mean(selected_date, metric))
+        for metric in METRICS
+    }
+    return df_plot, averages
+
+
+def run(days=1095, repeat=5):
+    """
+    Time both preparations for the five most recent days of a synthetic history.
+
+    Parameters:
+        days (int): Days of hourly history in the frame.
+        repeat (int): Timed repetitions.
+
+    Returns:
+        dict: Timings of the legacy path, the one-off index build and the per-view lookups.
+    """
+    history = generate_history(days=days)
+    df = history.sort_values('RECORD_TIMESTAMP', ascending=False).drop_duplicates('DATE').sort_values('DATE')
+    recent = sorted(df['DATE'].dt.normalize().unique())[-5:]
+
+    legacy = measure(lambda: [legacy_prep(df, pd.Timestamp(day)) for day in recent], repeat=repeat)
+    build = measure(lambda: DayIndex(df, METRICS), repeat=repeat)
+    day_index = build['result']
+    lookups = measure(lambda: [indexed_prep(day_index, pd.Timestamp(day)) for day in recent], repeat=repeat)
+
+    # Both paths must agree before their timings mean anything
+    for (_, old), (_, new) in zip(legacy['result'], lookups['result']):
+        for metric in METRICS:
+            check(all(abs(a - b) < 1e-9 for a, b in zip(old[metric], new[metric])), f"{metric} averages differ")
+
+    return {
+        'rows': len(df),
+        'views': len(recent),
+        'legacy': summarize(legacy),
+        'index_build': summarize(build),
+        'indexed_lookups': summarize(lookups),
+        'speedup_including_build': round(legacy['median_s'] / (build['median_s'] + lookups['median_s']), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
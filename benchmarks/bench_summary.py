@@ -0,0 +1,108 @@
+"""
+Compare the original summary table and worst-day warning, computed from the hourly
+frame on every rerun, with the Home.py functions reading the daily rollup.
+
+Streamlit output calls are replaced by no-ops, so only the pandas work is timed.
+
+Usage:
+    python -m benchmarks.bench_summary --days 1095
+"""
+import argparse
+import json
+from datetime import date, timedelta
+from unittest import mock
+
+import pandas as pd
+
+import Home
+from aggregations import daily_rollup
+from benchmarks.synthetic import generate_history
+from benchmarks.timing import check, measure, summarize
+
+
+class NullStreamlit:
+    """Stand-in for the streamlit module whose calls render nothing."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def legacy_summary(df):
+    """The original calculate_and_display_summary: one filter and concat per day."""
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    df = df.sort_values('DATE', ascending=False)
+    last_five_days = df['DATE'].dt.date.unique()[:5]
+    summary_df = pd.DataFrame()
+    for day in last_five_days:
+        df_day = df[df['DATE'].dt.date == day]
+        daily_avg = df_day[['AQI', 'O3', 'PM10', 'PM2_5']].mean()
+        col_name = pd.MultiIndex.from_tuples([(day.strftime('%A'), day.strftime('%m/%d/%Y'))], names=['Day', 'Date'])
+        summary_df = pd.concat([summary_df, pd.DataFrame(daily_avg).T.set_index(col_name)], axis=0)
+    summary_df = summary_df.transpose().apply(lambda column: column.map("{0:.2f}".format))
+    return summary_df[summary_df.columns[::-1]]
+
+
+def legacy_worst_days(df):
+    """The pandas work of the original display_worst_day_warning."""
+    today = date.today()
+    next_five_days = [today + timedelta(days=i) for i in range(1, 6)]
+    df_next_five_days = df[df['DATE'].dt.date.isin(next_five_days)]
+    daily_avg = df_next_five_days.groupby(df_next_five_days['DATE'].dt.date)[['AQI', 'PM10', 'O3', 'PM2_5']].mean()
+    return daily_avg.idxmax()
+
+
+def legacy_view(df):
+    return legacy_summary(df.copy()), legacy_worst_days(df)
+
+
+def rollup_view(daily):
+    summary_df = Home.calculate_and_display_summary(daily)
+    Home.display_worst_day_warning(daily)
+    return summary_df
+
+
+def run(days=1095, repeat=5):
+    """
+    Time the summary and worst-day views of a synthetic history.
+
+    Parameters:
+        days (int): Days of hourly history in the frame.
+        repeat (int): Timed repetitions.
+
+    Returns:
+        dict: Timings of the legacy path, of the rollup computed in pandas, and of the
+            Home.py functions given the materialized rollup.
+    """
+    history = generate_history(days=days)
+    df = history.sort_values('RECORD_TIMESTAMP', ascending=False).drop_duplicates('DATE').sort_values('DATE')
+
+    with mock.patch.object(Home, 'st', NullStreamlit()):
+        legacy = measure(lambda: legacy_view(df), repeat=repeat)
+        rollup = measure(lambda: daily_rollup(df), repeat=repeat)
+        daily = rollup['result']
+        views = measure(lambda: rollup_view(daily), repeat=repeat)
+
+    # Both paths must agree before their timings mean anything
+    check(not views['result'].empty, "the summary table is empty")
+    check(legacy['result'][0].values.tolist() == views['result'].values.tolist(), "legacy and rollup summaries differ")
+
+    return {
+        'rows': len(df),
+        'legacy': summarize(legacy),
+        'rollup_build': summarize(rollup),
+        'views_from_rollup': summarize(views),
+        'speedup': round(legacy['median_s'] / views['median_s'], 1),
+        'speedup_including_rollup': round(legacy['median_s'] / (rollup['median_s'] + views['median_s']), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
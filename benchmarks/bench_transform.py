@@ -0,0 +1,108 @@
+"""
+Compare the original per-entry transform loop with the vectorized transform in etl.py.
+
+Usage:
+    python -m benchmarks.bench_transform --locations 500
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.timing import check, measure, summarize
+from etl import transform_air_quality
+
+SAMPLE_PAYLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'pollen_data.json')
+
+
+def synthetic_payloads(locations, seed=0):
+    """
+    Copies of the sample forecast payload with jittered coordinates and readings.
+
+    Parameters:
+        locations (int): Number of payloads, one per location.
+        seed (int): Random seed.
+
+    Returns:
+        list: Payloads shaped like the /data/2.5/air_pollution/forecast response.
+    """
+    rng = np.random.default_rng(seed)
+    with open(SAMPLE_PAYLOAD) as f:
+        template = json.load(f)
+    payloads = []
+    for i in range(locations):
+        scale = rng.uniform(0.5, 1.5)
+        payloads.append({
+            'coord': {'lon': template['coord']['lon'] - i * 0.01, 'lat': template['coord']['lat'] + i * 0.01},
+            'list': [
+                {
+                    'main': dict(forecast['main']),
+                    'components': {key: round(value * scale, 2) for key, value in forecast['components'].items()},
+                    'dt': forecast['dt'],
+                }
+                for forecast in template['list']
+            ],
+        })
+    return payloads
+
+
+def legacy_transform(payloads, run_timestamp):
+    """The original loop: one list per entry, one scalar pd.to_datetime call per entry."""
+    rows = []
+    for data2 in payloads:
+        for forecast in data2['list']:
+            air_quality_data = [
+                data2['coord']['lon'],
+                data2['coord']['lat'],
+                pd.to_datetime(forecast['dt'], unit='s').strftime('%Y-%m-%d %H:%M:%S'),
+                forecast['main']['aqi'],
+                forecast['components']['co'],
+                forecast['components']['no'],
+                forecast['components']['no2'],
+                forecast['components']['o3'],
+                forecast['components']['so2'],
+                forecast['components']['pm2_5'],
+                forecast['components']['pm10'],
+                forecast['components']['nh3'],
+            ]
+            air_quality_data.append(run_timestamp)
+            rows.append(tuple(air_quality_data))
+    return rows
+
+
+def run(locations=500, repeat=5):
+    """
+    Transform `locations` payloads with both implementations.
+
+    Parameters:
+        locations (int): Number of payloads (96 entries each).
+        repeat (int): Timed repetitions per implementation.
+
+    Returns:
+        dict: Timings and rows/sec per implementation.
+    """
+    payloads = synthetic_payloads(locations)
+    run_timestamp = datetime.now()
+    results = {'locations': locations}
+    for name, transform in (('legacy_loop', legacy_transform), ('vectorized', transform_air_quality)):
+        timing = measure(lambda: transform(payloads, run_timestamp), repeat=repeat)
+        rows = len(timing['result'])
+        results[name] = {**summarize(timing), 'rows': rows, 'rows_per_s': round(rows / timing['median_s'])}
+    check(results['vectorized']['rows'] == results['legacy_loop']['rows'] > 0, "both transforms must produce the same rows")
+    results['speedup'] = round(results['legacy_loop']['median_s'] / results['vectorized']['median_s'], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--locations', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.locations, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Time the Trends page over years of history: building the TrendIndex, reading
+one pollutant's views from it, and scoring forecast accuracy in the database.
+
+Usage:
+    python -m benchmarks.bench_trends --days 1095 --reforecasts 4
+"""
+import argparse
+import json
+import sqlite3
+
+from aggregations import TrendIndex, accuracy_by_lead_day, daily_rollup
+from benchmarks.synthetic import generate_history, load_duckdb, load_sqlite
+from benchmarks.timing import check, measure, summarize
+from database import DUCKDB, POLLUTANT_COLUMNS, SQLITE, fetch_forecast_accuracy
+from etl import compact, migrate
+
+
+def pollutant_views(trends, metric):
+    return trends.rolling_means(metric), trends.percentiles(metric), trends.heatmap(metric)
+
+
+def run(days=1095, reforecasts=4, repeat=5):
+    """
+    Run the trends benchmark, the accuracy query against SQLite and, when installed, DuckDB.
+
+    Parameters:
+        days (int): Days of synthetic history.
+        reforecasts (int): Forecast versions per DATE.
+        repeat (int): Timed repetitions.
+
+    Returns:
+        dict: Timings of the index build, of one pollutant's views, and of the accuracy query
+            before and after compaction.
+    """
+    history = generate_history(days=days, reforecasts=reforecasts)
+    hourly = history.sort_values('RECORD_TIMESTAMP', ascending=False).drop_duplicates('DATE').sort_values('DATE')
+    daily = daily_rollup(hourly)
+
+    build = measure(lambda: TrendIndex(hourly, daily, POLLUTANT_COLUMNS), repeat=repeat)
+    trends = build['result']
+    views = measure(lambda: pollutant_views(trends, 'NO2'), repeat=repeat)
+    check(all(len(view) > 0 for view in views['result']), "a trend view is empty")
+    results = {'rows': len(history), 'build_index': summarize(build), 'pollutant_views': summarize(views), 'accuracy': {}}
+
+    backends = [('sqlite', load_sqlite(history, sqlite3.connect(':memory:')), SQLITE)]
+    try:
+        import duckdb
+        backends.append(('duckdb', load_duckdb(history, duckdb.connect()), DUCKDB))
+    except ImportError:
+        pass
+    for name, conn, dialect in backends:
+        migrate(conn, dialect)
+        before = measure(lambda: fetch_forecast_accuracy(conn, 'Phoenix', dialect=dialect), repeat=repeat)
+        compact(conn, dialect)
+        after = measure(lambda: fetch_forecast_accuracy(conn, 'Phoenix', dialect=dialect), repeat=repeat)
+        # Compaction moves superseded versions to the archive, the scores must not change
+        check(len(before['result']) > 0, f"{name}: no forecast was scored")
+        check(before['result'].round(6).equals(after['result'].round(6)), f"{name}: the scores changed after compaction")
+        rollup = measure(lambda: accuracy_by_lead_day(after['result'], POLLUTANT_COLUMNS), repeat=repeat)
+        results['accuracy'][name] = {
+            'lead_hours': len(after['result']),
+            'query_uncompacted': summarize(before),
+            'query_compacted': summarize(after),
+            'by_lead_day': summarize(rollup),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=1095)
+    parser.add_argument('--reforecasts', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.reforecasts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Local stand-in for the OpenWeatherMap endpoints used by the ETL.
+
+Serves the geocoding, current weather and air pollution forecast endpoints from
+the sample payload in data/, with optional latency and injected 429 responses
+so retry and rate-limit handling can be exercised offline.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_PAYLOAD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'pollen_data.json')
+
+WEATHER_TEMPLATE = {
+    'coord': {'lon': 0.0, 'lat': 0.0},
+    'weather': [{'id': 800, 'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+    'main': {'temp': 305.2, 'feels_like': 303.9, 'temp_min': 303.1, 'temp_max': 307.0, 'pressure': 1009, 'humidity': 12},
+    'wind': {'speed': 3.6, 'deg': 250},
+    'clouds': {'all': 0},
+    'sys': {'country': 'US', 'sunrise': 1685362200, 'sunset': 1685412900},
+    'name': 'Phoenix',
+}
+
+
+def _coordinates(key):
+    """Stable fake coordinates around Phoenix for any city or zip query."""
+    offset = zlib.crc32(key.encode()) % 1000 / 1000
+    return round(33.4484 + offset, 4), round(-112.0741 - offset, 4)
+
+
+class FakeOpenWeatherMap(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_s=0.0, rate_limit_every=0):
+        super().__init__(address, _Handler)
+        self.latency_s = latency_s
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        with open(SAMPLE_PAYLOAD) as f:
+            self.forecast = json.load(f)
+
+    def next_request_is_limited(self):
+        with self._lock:
+            self.requests += 1
+            limited = self.rate_limit_every and self.requests % self.rate_limit_every == 0
+            self.rate_limited += bool(limited)
+            return limited
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency_s)
+        if server.next_request_is_limited():
+            self._send(429, {'cod': 429, 'message': 'rate limited'}, {'Retry-After': '0'})
+            return
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/geo/1.0/direct':
+            lat, lon = _coordinates(query['q'])
+            self._send(200, [{'name': query['q'].split(',')[0], 'lat': lat, 'lon': lon}])
+        elif url.path == '/geo/1.0/zip':
+            lat, lon = _coordinates(query['zip'])
+            self._send(200, {'zip': query['zip'], 'lat': lat, 'lon': lon})
+        elif url.path == '/data/2.5/weather':
+            coord = {'lat': float(query['lat']), 'lon': float(query['lon'])}
+            self._send(200, {**WEATHER_TEMPLATE, 'coord': coord})
+        elif url.path == '/data/2.5/air_pollution/forecast':
+            coord = {'lat': float(query['lat']), 'lon': float(query['lon'])}
+            self._send(200, {**server.forecast, 'coord': coord})
+        else:
+            self._send(404, {'cod': 404, 'message': 'not found'})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def serve(latency_ms=0, rate_limit_every=0):
+    """
+    Run the fake API on a free local port for the duration of a with block.
+
+    Parameters:
+        latency_ms (float): Delay added to every response.
+        rate_limit_every (int): Answer every Nth request with 429, 0 to disable.
+
+    Yields:
+        FakeOpenWeatherMap: The running server; its base URL is `server.base_url`.
+    """
+    server = FakeOpenWeatherMap(('127.0.0.1', 0), latency_ms / 1000, rate_limit_every)
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
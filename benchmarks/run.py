@@ -0,0 +1,161 @@
+"""
+Run the benchmark suite and write one JSON report, optionally checked against a previous one.
+
+Every benchmark runs offline against synthetic data. The report records the
+commit and library versions next to the results, so reports from different
+runs can be compared to track regressions.
+
+Usage:
+    python -m benchmarks.run --profile quick
+    python -m benchmarks.run --only fetch summary --compare benchmarks/results/baseline.json
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+
+from benchmarks.timing import CheckFailed
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Benchmark name -> module, with the arguments of its run() per profile
+BENCHMARKS = {
+    'fetch': ('benchmarks.bench_fetch', {'quick': {'days': 365, 'repeat': 3}, 'full': {}}),
+    'compaction': ('benchmarks.bench_compaction', {'quick': {'days': 365, 'repeat': 3}, 'full': {}}),
+    'summary': ('benchmarks.bench_summary', {'quick': {'days': 365, 'repeat': 3}, 'full': {}}),
+    'locations': ('benchmarks.bench_locations', {'quick': {'days': 15, 'locations': 100, 'repeat': 3}, 'full': {}}),
+    'trends': ('benchmarks.bench_trends', {'quick': {'days': 365, 'repeat': 3}, 'full': {}}),
+    'plot_prep': ('benchmarks.bench_plot_prep', {'quick': {'days': 365, 'repeat': 3}, 'full': {}}),
+    'export': ('benchmarks.bench_export', {'quick': {'days': 15, 'locations': 4, 'repeat': 2}, 'full': {}}),
+    'figures': ('benchmarks.bench_figures', {'quick': {'days': 90, 'repeat': 3}, 'full': {}}),
+    'transform': ('benchmarks.bench_transform', {'quick': {'locations': 100, 'repeat': 3}, 'full': {}}),
+    'load': ('benchmarks.bench_load', {'quick': {'round_trip_ms': 5, 'runs': 2}, 'full': {}}),
+    'extract': ('benchmarks.bench_extract', {'quick': {'locations': 16, 'latency_ms': 20, 'workers': (1, 8)}, 'full': {}}),
+    'imports': ('benchmarks.bench_import', {'quick': {'repeat': 3}, 'full': {}}),
+}
+
+PACKAGES = ['pandas', 'numpy', 'duckdb', 'plotly', 'streamlit', 'requests']
+
+
+def environment(profile):
+    """Where and on what the suite ran."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = importlib.import_module(package).__version__
+        except ImportError:
+            versions[package] = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'profile': profile,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'packages': versions,
+    }
+
+
+def run_suite(names, profile='quick'):
+    """
+    Run benchmarks one after the other.
+
+    A benchmark that fails is reported with its traceback instead of stopping the suite,
+    one whose result check fails with the check's message.
+
+    Parameters:
+        names (list): Keys of BENCHMARKS.
+        profile (str): 'quick' for small inputs, 'full' for each benchmark's defaults.
+
+    Returns:
+        dict: The environment and each benchmark's result.
+    """
+    report = {'environment': environment(profile), 'results': {}}
+    for name in names:
+        module_name, profiles = BENCHMARKS[name]
+        began = time.perf_counter()
+        try:
+            result = importlib.import_module(module_name).run(**profiles[profile])
+        except CheckFailed as e:
+            result = {'check_failed': str(e)}
+        except Exception:
+            result = {'error': traceback.format_exc()}
+        result['wall_s'] = round(time.perf_counter() - began, 3)
+        report['results'][name] = result
+        status = ' (failed)' if 'error' in result else f" (check failed: {result['check_failed']})" if 'check_failed' in result else ''
+        print(f"{name}: {result['wall_s']}s{status}", file=sys.stderr)
+    return report
+
+
+def _medians(node, path=''):
+    """Yield (path, median_s) for every timing in a result tree."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == 'median_s' and isinstance(value, (int, float)):
+                yield path, value
+            else:
+                yield from _medians(value, f'{path}.{key}' if path else key)
+
+
+def compare(report, baseline, threshold=1.25):
+    """
+    List the timings that got slower than in a baseline report.
+
+    Parameters:
+        report (dict): Output of run_suite().
+        baseline (dict): An earlier report.
+        threshold (float): Ratio of new to old median above which a timing counts as a regression.
+
+    Returns:
+        list: {'timing', 'baseline_s', 'current_s', 'ratio'} for each regression, worst first.
+    """
+    previous = dict(_medians(baseline['results']))
+    regressions = []
+    for path, current in _medians(report['results']):
+        old = previous.get(path)
+        if old and current / old > threshold:
+            regressions.append({'timing': path, 'baseline_s': old, 'current_s': current, 'ratio': round(current / old, 2)})
+    return sorted(regressions, key=lambda regression: regression['ratio'], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=['quick', 'full'], default='quick')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Benchmarks to run, all by default")
+    parser.add_argument('--output', help="Report file, benchmarks/results/<timestamp>.json by default")
+    parser.add_argument('--compare', help="Earlier report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.only or list(BENCHMARKS), args.profile)
+    if args.compare:
+        with open(args.compare) as f:
+            report['regressions'] = compare(report, json.load(f), args.threshold)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(output)
+
+    failed = [name for name, result in report['results'].items() if 'error' in result or 'check_failed' in result]
+    if failed or report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
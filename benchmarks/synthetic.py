@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from database import AIR_QUALITY_COLUMNS, AIR_QUALITY_TABLE, DUCKDB, SQLITE
+from etl import create_tables, frame_to_rows, insert_air_quality_sql
+
+PHOENIX = (-112.0741, 33.4484)
+
+
+def location_name(location_id):
+    return 'Phoenix' if location_id == 0 else f'Location {location_id}'
+
+def _pollutants(rng, date_values):
+    """Random pollutant readings with a diurnal cycle for O3 and PM10."""
+    n = len(date_values)
+    hour = pd.DatetimeIndex(date_values).hour.values
+    diurnal = 1 + 0.5 * np.sin((hour - 6) / 24 * 2 * np.pi)
+    return {
+        'AQI': rng.integers(1, 6, n),
+        'CO': rng.gamma(4, 60, n),
+        'NO': rng.gamma(1, 0.5, n),
+        'NO2': rng.gamma(2, 5, n),
+        'O3': rng.gamma(8, 10, n) * diurnal,
+        'SO2': rng.gamma(1, 1, n),
+        'PM2_5': rng.gamma(2, 3, n),
+        'PM10': rng.gamma(3, 6, n) * diurnal,
+        'NH3': rng.gamma(1, 1, n),
+    }
+
+
+def generate_history(days=365, locations=1, reforecasts=4, end=None, seed=0):
+    """
+    Generate a synthetic AIR_QUALITY_DATA history.
+
+    Every hourly DATE is forecast `reforecasts` times, once per daily ETL run,
+    so the table has the same superseded-row pile-up as production.
+
+    Parameters:
+        days (int): Number of days of hourly forecasts ending at `end`.
+        locations (int): Number of distinct coordinates.
+        reforecasts (int): Number of forecast versions stored for each DATE.
+        end (datetime or None): Last forecast day, defaults to four days from today.
+        seed (int): Random seed.
+
+    Returns:
+        df (pandas.DataFrame): Rows with the AIR_QUALITY_DATA columns.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize() + pd.Timedelta(days=4)
+    dates = pd.date_range(end=end.normalize() + pd.Timedelta(hours=23), periods=days * 24, freq='h')
+
+    n_dates = len(dates)
+    location_ids = np.repeat(np.arange(locations), n_dates * reforecasts)
+    date_values = np.tile(np.repeat(dates.values, reforecasts), locations)
+    versions = np.tile(np.arange(reforecasts), n_dates * locations)
+
+    # Each version comes from an ETL run one day earlier than the next
+    lead = pd.to_timedelta(versions * 24 + 1, unit='h').values
+    record_timestamps = pd.DatetimeIndex(date_values).normalize().values - lead
+
+    names = np.array([location_name(i) for i in range(locations)], dtype=object)
+    df = pd.DataFrame({
+        'LOCATION': names[location_ids],
+        'LON': PHOENIX[0] + location_ids * 0.05,
+        'LAT': PHOENIX[1] + location_ids * 0.05,
+        'DATE': date_values,
+        **_pollutants(rng, date_values),
+        'RECORD_TIMESTAMP': record_timestamps,
+    })
+    # ETL runs cannot have happened in the future, so upcoming DATEs have fewer versions
+    df = df[df['RECORD_TIMESTAMP'] <= pd.Timestamp.now()]
+    return df[AIR_QUALITY_COLUMNS].reset_index(drop=True)
+
+
+def generate_batch(run_timestamp, hours=96, seed=0):
+    """
+    Generate one ETL run's forecast batch starting at the run's hour.
+
+    Parameters:
+        run_timestamp (datetime): RECORD_TIMESTAMP shared by the batch.
+        hours (int): Number of hourly forecasts, the API returns 96.
+        seed (int): Random seed.
+
+    Returns:
+        df (pandas.DataFrame): Rows with the AIR_QUALITY_DATA columns.
+    """
+    rng = np.random.default_rng(seed)
+    run_timestamp = pd.Timestamp(run_timestamp)
+    dates = pd.date_range(start=run_timestamp.floor('h'), periods=hours, freq='h')
+    df = pd.DataFrame({
+        'LOCATION': location_name(0),
+        'LON': PHOENIX[0],
+        'LAT': PHOENIX[1],
+        'DATE': dates.values,
+        **_pollutants(rng, dates.values),
+        'RECORD_TIMESTAMP': run_timestamp,
+    })
+    return df[AIR_QUALITY_COLUMNS]
+
+
+def load_sqlite(df, conn):
+    """
+    Load a synthetic history into a SQLite connection, with the tables and row format of etl.py.
+
+    Parameters:
+        df (pandas.DataFrame): Output of generate_history().
+        conn (sqlite3.Connection): Target connection.
+
+    Returns:
+        conn (sqlite3.Connection): The same connection, for chaining.
+    """
+    create_tables(conn, SQLITE)
+    conn.executemany(insert_air_quality_sql(SQLITE), frame_to_rows(df))
+    conn.execute(f"CREATE INDEX IF NOT EXISTS IDX_AQ_DATE ON {AIR_QUALITY_TABLE} (DATE, RECORD_TIMESTAMP)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS IDX_AQ_RECORD ON {AIR_QUALITY_TABLE} (RECORD_TIMESTAMP)")
+    conn.commit()
+    return conn
+
+
+def load_duckdb(df, conn):
+    """
+    Load a synthetic history into a DuckDB connection, with the tables of etl.py.
+
+    Parameters:
+        df (pandas.DataFrame): Output of generate_history().
+        conn (duckdb.DuckDBPyConnection): Target connection.
+
+    Returns:
+        conn (duckdb.DuckDBPyConnection): The same connection, for chaining.
+    """
+    create_tables(conn, DUCKDB)
+    columns = ', '.join(AIR_QUALITY_COLUMNS)
+    # The frame's timestamps are inserted as TIMESTAMP values, with their microseconds
+    conn.register('SYNTHETIC_HISTORY', df)
+    conn.execute(f"INSERT INTO {AIR_QUALITY_TABLE} ({columns}) SELECT {columns} FROM SYNTHETIC_HISTORY")
+    conn.unregister('SYNTHETIC_HISTORY')
+    return conn
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+
+class CheckFailed(Exception):
+    """A benchmark produced an empty or wrong result, so its timings mean nothing."""
+
+
+def check(condition, message):
+    """
+    Fail the benchmark unless its result is sound.
+
+    The fetch helpers return an empty frame when a query fails, which would
+    otherwise be timed and reported as a speedup.
+
+    Parameters:
+        condition (bool): What must hold.
+        message (str): Reported when it does not.
+    """
+    if not condition:
+        raise CheckFailed(message)
+
+
+def measure(func, repeat=5, warmup=1):
+    """
+    Time repeated calls of a function.
+
+    Parameters:
+        func (callable): Zero-argument function to time.
+        repeat (int): Number of timed calls.
+        warmup (int): Number of untimed calls made first.
+
+    Returns:
+        dict: Best and median wall time in seconds, plus the last return value under 'result'.
+    """
+    result = None
+    for _ in range(warmup):
+        result = func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return {'best_s': min(timings), 'median_s': statistics.median(timings), 'result': result}
+
+
+def summarize(timing):
+    """
+    Drop the return value from a measure() result so it can be serialised.
+
+    Parameters:
+        timing (dict): Output of measure().
+
+    Returns:
+        dict: Timing figures rounded to microseconds.
+    """
+    return {key: round(value, 6) for key, value in timing.items() if key != 'result'}
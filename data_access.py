@@ -0,0 +1,385 @@
+import functools
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from aggregations import PLOT_METRICS, DayIndex, TrendIndex, daily_rollup
+from database import (
+    POLLUTANT_COLUMNS, AirQualitySnapshot, fetch_daily, fetch_data, fetch_forecast_accuracy, fetch_load_stats,
+    get_backend, latest_record_timestamp, table_storage_bytes
+)
+from figures import FigureCache
+from profiling import profiled, timed
+from refresher import Refresher
+
+# Where the dashboards read from, STORAGE_BACKEND picks Snowflake or the local DuckDB replica
+BACKEND = get_backend()
+# The ETL runs once a day; datasets nobody read during a whole interval are not reloaded
+ETL_INTERVAL = timedelta(hours=float(os.getenv('ETL_INTERVAL_HOURS', 24)))
+# How often the background refresher asks the warehouse whether a newer RECORD_TIMESTAMP has landed
+VERSION_CHECK_INTERVAL = timedelta(minutes=float(os.getenv('VERSION_CHECK_MINUTES', 10)))
+# Figures kept in memory: 5 selectable days x 4 metrics, with room for the previous data version
+FIGURE_CACHE_SIZE = int(os.getenv('FIGURE_CACHE_SIZE', 48))
+# Day indexes kept in memory, one per location viewed since the last data version
+DAY_INDEX_CACHE_SIZE = int(os.getenv('DAY_INDEX_CACHE_SIZE', 16))
+# Location selected when a session opens, if the table holds it
+DEFAULT_LOCATION = os.getenv('DEFAULT_LOCATION', 'Phoenix')
+# Columns each page reads from the hourly frame
+DASHBOARD_COLUMNS = ('DATE', 'RECORD_TIMESTAMP') + PLOT_METRICS
+TREND_COLUMNS = ('DATE', 'RECORD_TIMESTAMP') + tuple(POLLUTANT_COLUMNS)
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters shared by every session of the app."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._misses = {}
+
+    def call(self, name):
+        with self._lock:
+            self._calls[name] = self._calls.get(name, 0) + 1
+
+    def miss(self, name):
+        with self._lock:
+            self._misses[name] = self._misses.get(name, 0) + 1
+
+    def snapshot(self):
+        """
+        Summarize the counters.
+
+        Returns:
+            dict: {name: {'hits': int, 'misses': int, 'hit_rate': float}}
+        """
+        with self._lock:
+            summary = {}
+            for name, calls in self._calls.items():
+                misses = min(self._misses.get(name, 0), calls)
+                summary[name] = {'hits': calls - misses, 'misses': misses, 'hit_rate': (calls - misses) / calls}
+            return summary
+
+
+@st.cache_resource
+def get_snapshot(scope, columns=None, location=None):
+    """
+    Snapshot shared by every session, one per scope ('window' or 'history'), projection and location.
+
+    Released by _release_snapshot() when the refresher drops the dataset read through it.
+    """
+    return AirQualitySnapshot(columns, [location] if location is not None else None)
+
+
+def _release_snapshot(key):
+    # The refresher dropped this dataset, so the rows its snapshot holds are not served anymore
+    if key[0] == 'air_quality':
+        _, days, columns, location = key
+        get_snapshot.clear('history' if days is None else 'window', columns, location)
+
+
+@st.cache_resource
+def get_cache_stats():
+    return CacheStats()
+
+
+@st.cache_resource(validate=lambda conn: conn is not None and not conn.is_closed())
+def get_connection():
+    """
+    Open one warehouse connection per server process and reuse it across reruns and sessions.
+
+    Returns:
+        snowflake.connector.connection object, or None if the warehouse is unreachable.
+    """
+    get_cache_stats().miss('connection')
+    with timed('connect'):
+        return BACKEND.connect_readonly()
+
+
+@contextmanager
+def open_connection():
+    """
+    Connection to the configured backend for the duration of one query.
+
+    The warehouse connection is shared and stays open; a local replica is
+    opened read-only and closed again, so the ETL can take its write lock.
+
+    Yields:
+        DB-API connection, ConnectionError is raised instead if the backend is unavailable.
+    """
+    get_cache_stats().call('connection')
+    if BACKEND.persistent:
+        conn = get_connection()
+    else:
+        get_cache_stats().miss('connection')
+        with timed('connect'):
+            conn = BACKEND.connect_readonly()
+    if conn is None:
+        raise ConnectionError(f"{BACKEND.name} is unreachable")
+    try:
+        yield conn
+    finally:
+        if not BACKEND.persistent:
+            conn.close()
+
+
+def _check_data_version():
+    # Runs on the refresher thread; raising counts as a failed check
+    with open_connection() as conn:
+        version = latest_record_timestamp(conn)
+    if version is None:
+        raise LookupError("No data version returned")
+    return version
+
+
+@st.cache_resource
+def get_refresher():
+    """
+    Background refresher shared by every session, started with the server's first page load.
+
+    Returns:
+        Refresher
+    """
+    refresher = Refresher(
+        _check_data_version, VERSION_CHECK_INTERVAL.total_seconds(), idle_after=ETL_INTERVAL.total_seconds(),
+        stats=get_cache_stats(), on_evict=_release_snapshot
+    )
+    # Learn the current version before the first dataset is loaded, so it is not reloaded right away
+    refresher.refresh()
+    refresher.start()
+    return refresher
+
+
+def get_data_version():
+    """
+    Version of the data being served: the newest RECORD_TIMESTAMP the refresher has loaded.
+
+    Returns:
+        datetime or None: None until the warehouse has been reached once.
+    """
+    return get_refresher().version
+
+
+def select_location(locations):
+    """
+    Sidebar picker of the location a page shows, preselecting DEFAULT_LOCATION.
+
+    Parameters:
+        locations (list): Location names, in display order.
+
+    Returns:
+        str or None: The selected location, None when there are no locations.
+    """
+    if not locations:
+        return None
+    default_index = locations.index(DEFAULT_LOCATION) if DEFAULT_LOCATION in locations else 0
+    return st.sidebar.selectbox('Location', options=locations, index=default_index)
+
+
+def window_start(days):
+    """
+    First day of a window of `days` days before today.
+
+    Datasets are keyed on the window length rather than on this date, so the
+    key does not change at midnight; the window start is computed each time
+    the dataset is fetched and each time it is read.
+
+    Parameters:
+        days (int or None): Days of history before today, None for the whole history.
+
+    Returns:
+        date or None
+    """
+    return date.today() - timedelta(days=days) if days is not None else None
+
+
+def _slice_window(df, column, start):
+    # A frame fetched before midnight still holds the day that has left the window since
+    if start is None or df.empty or df[column].min() >= pd.Timestamp(start):
+        return df
+    return df[df[column] >= pd.Timestamp(start)].reset_index(drop=True)
+
+
+def _fetch_air_quality(days, columns, location):
+    start = window_start(days)
+    with open_connection() as conn:
+        fetch = functools.partial(fetch_data, dialect=BACKEND.dialect)
+        with timed('fetch_data'):
+            df = get_snapshot('history' if start is None else 'window', columns, location).refresh(conn, start, fetch=fetch)
+    if df.empty:
+        # Raising keeps the last good frame in place
+        raise LookupError("No air quality data returned")
+    return df
+
+
+@profiled()
+def load_air_quality(days=None, columns=None, location=None):
+    """
+    Load the deduplicated air quality frame through the background refresher.
+
+    Only the first read of a (days, columns, location) waits for the warehouse.
+    Later reads are served from memory while the refresher reloads the frame after
+    each ETL run, fetching only the rows loaded since the previous refresh.
+
+    Parameters:
+        days (int or None): Days of history before today, None for the whole history.
+        columns (tuple or None): Columns the caller reads, None for all of them.
+        location (str or None): Only fetch this LOCATION, None for every location.
+
+    Returns:
+        df (pandas.DataFrame): Latest record per LOCATION and DATE.
+    """
+    columns = tuple(columns) if columns is not None else None
+    df, _ = get_refresher().get(
+        ('air_quality', days, columns, location), functools.partial(_fetch_air_quality, days, columns, location)
+    )
+    return _slice_window(df, 'DATE', window_start(days))
+
+
+def _fetch_daily(days):
+    start = window_start(days)
+    with open_connection() as conn:
+        with timed('fetch_daily'):
+            daily = fetch_daily(conn, start=start, dialect=BACKEND.dialect)
+    if daily.empty:
+        # The rollup has not been materialized yet (migration pending), derive it from the hourly rows
+        hourly = _fetch_air_quality(days, None, None)
+        with timed('daily_rollup'):
+            daily = daily_rollup(hourly)
+    return daily
+
+
+@profiled()
+def load_daily(days=None, location=None):
+    """
+    Load the AIR_QUALITY_DAILY rollup through the background refresher.
+
+    Every location is fetched in one query and held once, a single location
+    is filtered from that frame.
+
+    Parameters:
+        days (int or None): Days of history before today, None for the whole history.
+        location (str or None): Only keep this LOCATION, None for every location.
+
+    Returns:
+        daily (pandas.DataFrame): One row per location and day.
+    """
+    daily, _ = get_refresher().get(('daily', days), functools.partial(_fetch_daily, days))
+    daily = _slice_window(daily, 'DAY', window_start(days))
+    if location is None:
+        return daily
+    return daily[daily['LOCATION'] == location].reset_index(drop=True)
+
+
+def _fetch_table_stats():
+    with open_connection() as conn:
+        with timed('fetch_load_stats'):
+            stats = fetch_load_stats(conn, BACKEND.dialect)
+        if stats.empty:
+            raise LookupError("No air quality data returned")
+        with timed('table_storage_bytes'):
+            return stats, table_storage_bytes(conn, dialect=BACKEND.dialect)
+
+
+@profiled()
+def load_table_stats():
+    """
+    Load the per-day counts and the table size shown on the Metadata page.
+
+    Returns:
+        (pandas.DataFrame, int or None): Output of fetch_load_stats() and the table size in bytes.
+    """
+    table_stats, _ = get_refresher().get(('table_stats',), _fetch_table_stats)
+    return table_stats
+
+
+@st.cache_resource(max_entries=DAY_INDEX_CACHE_SIZE)
+def _load_day_index(start, location, data_version, _df):
+    # The frame is not hashed, (window start, location, data version) identifies it
+    get_cache_stats().miss('day_index')
+    with timed('build_day_index'):
+        return DayIndex(_df, PLOT_METRICS)
+
+
+@profiled()
+def load_day_index(days=None, location=None):
+    """
+    Shared, read-only DayIndex over the served frame of one location, rebuilt once per data version.
+
+    Parameters:
+        days (int or None): Days of history before today, None for the whole history.
+        location (str or None): LOCATION to index, None when the table holds a single location.
+
+    Returns:
+        (DayIndex, datetime or None): The index and the data version it was built from,
+            to key anything derived from it.
+    """
+    columns = tuple(DASHBOARD_COLUMNS)
+    df, data_version = get_refresher().get(
+        ('air_quality', days, columns, location), functools.partial(_fetch_air_quality, days, columns, location)
+    )
+    start = window_start(days)
+    get_cache_stats().call('day_index')
+    # The index is rebuilt from memory when the window moves at midnight, no query is made
+    return _load_day_index(start, location, data_version, _slice_window(df, 'DATE', start)), data_version
+
+
+@st.cache_resource(max_entries=DAY_INDEX_CACHE_SIZE)
+def _load_trends(location, data_version, _hourly, _daily):
+    get_cache_stats().miss('trends')
+    with timed('build_trend_index'):
+        return TrendIndex(_hourly, _daily, POLLUTANT_COLUMNS)
+
+
+@profiled()
+def load_trends(location=None):
+    """
+    Shared, read-only TrendIndex over the whole history of one location, rebuilt once per data version.
+
+    The hourly history is held by the background refresher like the dashboard
+    window, so a new ETL run only fetches the rows it loaded.
+
+    Parameters:
+        location (str or None): LOCATION to index, None when the table holds a single location.
+
+    Returns:
+        (TrendIndex, datetime or None): The index and the data version it was built from.
+    """
+    hourly, data_version = get_refresher().get(
+        ('air_quality', None, TREND_COLUMNS, location), functools.partial(_fetch_air_quality, None, TREND_COLUMNS, location)
+    )
+    daily = load_daily(location=location)
+    get_cache_stats().call('trends')
+    return _load_trends(location, data_version, hourly, daily), data_version
+
+
+def _fetch_forecast_accuracy(location):
+    with open_connection() as conn:
+        with timed('fetch_forecast_accuracy'):
+            accuracy = fetch_forecast_accuracy(conn, location, end=datetime.now(), dialect=BACKEND.dialect)
+    if accuracy.empty:
+        raise LookupError("No superseded forecasts to score")
+    return accuracy
+
+
+@profiled()
+def load_forecast_accuracy(location=None):
+    """
+    Load the forecast errors by lead hour of one location through the background refresher.
+
+    Parameters:
+        location (str or None): LOCATION to score, None for every location.
+
+    Returns:
+        accuracy (pandas.DataFrame): Output of fetch_forecast_accuracy().
+    """
+    accuracy, _ = get_refresher().get(('accuracy', location), functools.partial(_fetch_forecast_accuracy, location))
+    return accuracy
+
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(max_entries=FIGURE_CACHE_SIZE, stats=get_cache_stats())
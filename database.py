@@ -0,0 +1,565 @@
+import functools
+import os
+import threading
+from collections import namedtuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+AIR_QUALITY_TABLE = 'AIR_QUALITY_DATA'
+# Superseded forecasts, moved out of AIR_QUALITY_DATA by the loader and the compaction job
+AIR_QUALITY_ARCHIVE_TABLE = 'AIR_QUALITY_ARCHIVE'
+AIR_QUALITY_COLUMNS = [
+    'LOCATION', 'LON', 'LAT', 'DATE', 'AQI', 'CO', 'NO', 'NO2', 'O3', 'SO2', 'PM2_5', 'PM10', 'NH3', 'RECORD_TIMESTAMP'
+]
+TIMESTAMP_COLUMNS = ['DATE', 'RECORD_TIMESTAMP']
+# A forecast is identified by LOCATION and DATE, the newest RECORD_TIMESTAMP wins
+KEY_COLUMNS = ['LOCATION', 'DATE', 'RECORD_TIMESTAMP']
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+POLLUTANT_COLUMNS = ['AQI', 'CO', 'NO', 'NO2', 'O3', 'SO2', 'PM2_5', 'PM10', 'NH3']
+
+# In-memory dtypes: AQI is an index from 1 to 5, locations and coordinates repeat on every row
+COMPACT_DTYPES = {
+    'LOCATION': 'category',
+    'LON': 'category',
+    'LAT': 'category',
+    'AQI': 'int8',
+    **{pollutant: 'float32' for pollutant in POLLUTANT_COLUMNS if pollutant != 'AQI'},
+}
+
+# One row per location and day, with the mean and max of every pollutant
+DAILY_TABLE = 'AIR_QUALITY_DAILY'
+DAILY_KEY_COLUMNS = ['LOCATION', 'LON', 'LAT', 'DAY', 'HOURS']
+DAILY_COLUMNS = DAILY_KEY_COLUMNS + [
+    f'{pollutant}_{stat}' for pollutant in POLLUTANT_COLUMNS for stat in ('MEAN', 'MAX')
+]
+
+# SQL flavour differences between the warehouse and the embedded stand-ins used offline.
+# storage_bytes reads the on-disk size from catalog metadata; the embedded engines only
+# report it for the whole database file.
+# hours_between formats to the whole hours from timestamp {0} to timestamp {1}
+Dialect = namedtuple('Dialect', ['name', 'placeholder', 'supports_qualify', 'day_of', 'storage_bytes', 'hours_between'])
+
+SNOWFLAKE = Dialect(
+    'snowflake', '%s', True, 'TO_DATE({})',
+    "SELECT BYTES FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA = CURRENT_SCHEMA() AND TABLE_NAME = '{table}'",
+    'DATEDIFF(hour, {0}, {1})'
+)
+DUCKDB = Dialect(
+    'duckdb', '?', True, 'CAST({} AS DATE)',
+    "SELECT used_blocks * block_size FROM pragma_database_size() WHERE database_name = current_database()",
+    "date_diff('hour', {0}, {1})"
+)
+SQLITE = Dialect(
+    'sqlite', '?', False, 'DATE({})',
+    "SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()",
+    'CAST(ROUND((julianday({1}) - julianday({0})) * 24) AS INTEGER)'
+)
+
+# Local replica written by the ETL and read by the dashboards without a warehouse round trip
+DUCKDB_PATH = os.getenv('DUCKDB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'air_quality.duckdb'))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'snowflake')
+
+
+def connect_to_snowflake():
+    """
+    Establish connection with Snowflake database.
+
+    Returns:
+        snowflake.connector.connection object
+    """
+    try:
+        # Imported on first use, so the DuckDB backend and the benchmarks never load the connector
+        import snowflake.connector
+        return snowflake.connector.connect(
+            user=os.getenv('SNOWFLAKE_USER'),
+            password=os.getenv('SNOWFLAKE_PASSWORD'),
+            account=os.getenv('SNOWFLAKE_ACCOUNT'),
+            database=os.getenv('SNOWFLAKE_DATABASE'),
+            schema=os.getenv('SNOWFLAKE_SCHEMA')
+        )
+    except Exception as e:
+        print(f"Error connecting to Snowflake: {e}")
+        return None
+
+
+def connect_to_duckdb(path=None, read_only=False):
+    """
+    Open the local DuckDB replica.
+
+    Parameters:
+        path (str or None): Database file, DUCKDB_PATH by default.
+        read_only (bool): Open without taking the write lock, as the dashboards do.
+
+    Returns:
+        duckdb.DuckDBPyConnection object
+    """
+    path = path or DUCKDB_PATH
+    try:
+        import duckdb
+        if not read_only:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return duckdb.connect(path, read_only=read_only)
+    except Exception as e:
+        print(f"Error opening DuckDB database {path}: {e}")
+        return None
+
+
+# A storage backend: how to open it for writing and for reading, and which SQL it speaks.
+# Persistent connections are kept open by the dashboards; the others are opened per query,
+# so a reader never holds a local file while the ETL needs to write it.
+Backend = namedtuple('Backend', ['name', 'dialect', 'connect', 'connect_readonly', 'persistent'])
+
+BACKENDS = {
+    'snowflake': Backend('snowflake', SNOWFLAKE, connect_to_snowflake, connect_to_snowflake, True),
+    'duckdb': Backend('duckdb', DUCKDB, connect_to_duckdb, functools.partial(connect_to_duckdb, read_only=True), False),
+}
+
+
+def get_backend(name=None):
+    """
+    Look up a storage backend by name.
+
+    Parameters:
+        name (str or None): Key of BACKENDS, STORAGE_BACKEND by default.
+
+    Returns:
+        Backend
+    """
+    name = name or STORAGE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def _date_filter(start, end, dialect, since=None, locations=None):
+    """
+    Build the WHERE clause restricting rows to a DATE range.
+
+    Parameters:
+        start (datetime or None): Inclusive lower bound on DATE.
+        end (datetime or None): Exclusive upper bound on DATE.
+        dialect (Dialect): SQL dialect of the connection.
+        since (datetime or None): Exclusive lower bound on RECORD_TIMESTAMP.
+        locations (list or None): Only keep these LOCATIONs, all of them when None.
+
+    Returns:
+        (str, list): The clause (empty if unbounded) and its bound parameters.
+    """
+    conditions, params = [], []
+    if locations is not None:
+        conditions.append(f"LOCATION IN ({', '.join([dialect.placeholder] * len(locations))})")
+        params.extend(locations)
+    if start is not None:
+        conditions.append(f"DATE >= {dialect.placeholder}")
+        params.append(pd.Timestamp(start).strftime(TIMESTAMP_FORMAT))
+    if end is not None:
+        conditions.append(f"DATE < {dialect.placeholder}")
+        params.append(pd.Timestamp(end).strftime(TIMESTAMP_FORMAT))
+    if since is not None:
+        conditions.append(f"RECORD_TIMESTAMP > {dialect.placeholder}")
+        # RECORD_TIMESTAMP is loaded with microseconds, a whole-second bound would refetch the last batch
+        params.append(pd.Timestamp(since).strftime(TIMESTAMP_FORMAT + '.%f'))
+    clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return clause, params
+
+
+def latest_records_query(start=None, end=None, columns=None, dialect=SNOWFLAKE, since=None, locations=None):
+    """
+    Build the query returning only the most recent forecast for each LOCATION and DATE.
+
+    The deduplication happens in the warehouse with a ROW_NUMBER window, so
+    superseded forecast rows never leave the database.
+
+    Parameters:
+        start (datetime or None): Inclusive lower bound on DATE.
+        end (datetime or None): Exclusive upper bound on DATE.
+        columns (list or None): Columns to select, defaults to all of them.
+        dialect (Dialect): SQL dialect of the connection.
+        since (datetime or None): Only consider rows loaded after this RECORD_TIMESTAMP.
+        locations (list or None): Only fetch these LOCATIONs, all of them when None.
+
+    Returns:
+        (str, list): The SQL text and its bound parameters.
+    """
+    columns = list(columns or AIR_QUALITY_COLUMNS)
+    select_list = ', '.join(columns)
+    # The subquery must expose the ORDER BY keys even when they are not projected
+    inner_list = ', '.join(columns + [column for column in ('LOCATION', 'DATE') if column not in columns])
+    where, params = _date_filter(start, end, dialect, since, locations)
+    latest = "ROW_NUMBER() OVER (PARTITION BY LOCATION, DATE ORDER BY RECORD_TIMESTAMP DESC)"
+
+    if dialect.supports_qualify:
+        query = f"""
+            SELECT {select_list}
+            FROM {AIR_QUALITY_TABLE}
+            {where}
+            QUALIFY {latest} = 1
+            ORDER BY LOCATION, DATE
+        """
+    else:
+        query = f"""
+            SELECT {select_list}
+            FROM (
+                SELECT {inner_list}, {latest} AS RN
+                FROM {AIR_QUALITY_TABLE}
+                {where}
+            ) AS LATEST
+            WHERE RN = 1
+            ORDER BY LOCATION, DATE
+        """
+    return query, params
+
+
+def compact_frame(df):
+    """
+    Cast the columns of an air quality frame to the dtypes in COMPACT_DTYPES.
+
+    Parameters:
+        df (pandas.DataFrame): Frame with any subset of AIR_QUALITY_COLUMNS.
+
+    Returns:
+        df (pandas.DataFrame): The same frame with compact dtypes.
+    """
+    for column, dtype in COMPACT_DTYPES.items():
+        if column not in df:
+            continue
+        if dtype == 'int8' and df[column].isna().any():
+            dtype = 'Int8'
+        elif dtype == 'float32':
+            df[column] = pd.to_numeric(df[column])
+        df[column] = df[column].astype(dtype)
+    for column in TIMESTAMP_COLUMNS:
+        if column in df:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def _fetch_frame(cursor):
+    """
+    Read a cursor's result set into a DataFrame.
+
+    The Snowflake connector and DuckDB decode Arrow result batches straight
+    into numpy columns; other DB-API cursors fall back to fetchall() tuples.
+    """
+    if hasattr(cursor, 'fetch_pandas_all'):
+        return cursor.fetch_pandas_all()
+    if hasattr(cursor, 'fetchdf'):
+        return cursor.fetchdf()
+    return pd.DataFrame(cursor.fetchall(), columns=[x[0] for x in cursor.description])
+
+
+def fetch_data(conn, start=None, end=None, columns=None, dialect=SNOWFLAKE, since=None, locations=None):
+    """
+    Fetch the latest record per LOCATION and DATE from the database.
+
+    Parameters:
+        conn: DB-API connection (Snowflake, or SQLite/DuckDB when running offline).
+        start (datetime or None): Inclusive lower bound on DATE.
+        end (datetime or None): Exclusive upper bound on DATE.
+        columns (list or None): Columns to select, defaults to all of them.
+        dialect (Dialect): SQL dialect of the connection.
+        since (datetime or None): Only fetch rows loaded after this RECORD_TIMESTAMP.
+        locations (list or None): Only fetch these LOCATIONs, all of them when None.
+
+    Returns:
+        df (pandas.DataFrame): Dataframe containing fetched data, with compact dtypes.
+    """
+    try:
+        query, params = latest_records_query(start, end, columns, dialect, since, locations)
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        return compact_frame(_fetch_frame(cursor))
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        return pd.DataFrame()
+
+
+def merge_latest(snapshot, new_rows, start=None):
+    """
+    Merge newly fetched rows into a snapshot, keeping the latest record per LOCATION and DATE.
+
+    Parameters:
+        snapshot (pandas.DataFrame): Previously fetched latest-per-DATE rows.
+        new_rows (pandas.DataFrame): Rows loaded since the snapshot's high-water mark.
+        start (datetime or None): Rows with DATE before this are dropped from the result.
+
+    Returns:
+        df (pandas.DataFrame): Latest record per LOCATION and DATE, sorted by LOCATION and DATE.
+    """
+    df = pd.concat([new_rows, snapshot], ignore_index=True) if not new_rows.empty else snapshot
+    if start is not None:
+        df = df[df['DATE'] >= pd.Timestamp(start)]
+    # A stable sort keeps the incoming row first when two versions share a RECORD_TIMESTAMP
+    df = df.sort_values('RECORD_TIMESTAMP', ascending=False, kind='stable')
+    keys = [key for key in ('LOCATION', 'DATE') if key in df]
+    df = df.drop_duplicates(subset=keys, keep='first')
+    # Concatenating categoricals with different categories falls back to object
+    return compact_frame(df.sort_values(keys).reset_index(drop=True))
+
+
+def refresh_daily_rollup(conn, start=None, dialect=SNOWFLAKE):
+    """
+    Recompute AIR_QUALITY_DAILY from the latest forecasts for every location and day from `start` on.
+
+    Parameters:
+        conn: DB-API connection.
+        start (datetime or None): First day to recompute, None to rebuild the whole table.
+        dialect (Dialect): SQL dialect of the connection.
+    """
+    day = dialect.day_of.format('DATE')
+    stats = ', '.join(f'AVG({p}), MAX({p})' for p in POLLUTANT_COLUMNS)
+    where, params = _date_filter(pd.Timestamp(start).normalize() if start is not None else None, None, dialect)
+    delete = f"DELETE FROM {DAILY_TABLE}"
+    delete_params = []
+    if start is not None:
+        delete += f" WHERE DAY >= {dialect.placeholder}"
+        delete_params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute(delete, delete_params)
+        cur.execute(f"""
+            INSERT INTO {DAILY_TABLE} ({', '.join(DAILY_COLUMNS)})
+            SELECT LOCATION, MIN(LON), MIN(LAT), {day}, COUNT(*), {stats}
+            FROM (
+                SELECT LOCATION, LON, LAT, DATE, {', '.join(POLLUTANT_COLUMNS)},
+                       ROW_NUMBER() OVER (PARTITION BY LOCATION, DATE ORDER BY RECORD_TIMESTAMP DESC) AS RN
+                FROM {AIR_QUALITY_TABLE}
+                {where}
+            ) AS LATEST
+            WHERE RN = 1
+            GROUP BY LOCATION, {day}
+        """, params)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+
+def fetch_daily(conn, start=None, end=None, dialect=SNOWFLAKE, locations=None):
+    """
+    Fetch the daily rollup of every location, or of some of them, for a range of days.
+
+    Parameters:
+        conn: DB-API connection.
+        start (date or None): Inclusive first day.
+        end (date or None): Exclusive last day.
+        dialect (Dialect): SQL dialect of the connection.
+        locations (list or None): Only fetch these LOCATIONs, all of them when None.
+
+    Returns:
+        df (pandas.DataFrame): AIR_QUALITY_DAILY rows sorted by DAY and LOCATION.
+    """
+    try:
+        conditions, params = [], []
+        if locations is not None:
+            conditions.append(f"LOCATION IN ({', '.join([dialect.placeholder] * len(locations))})")
+            params.extend(locations)
+        if start is not None:
+            conditions.append(f"DAY >= {dialect.placeholder}")
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            conditions.append(f"DAY < {dialect.placeholder}")
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(DAILY_COLUMNS)} FROM {DAILY_TABLE} {where} ORDER BY DAY, LOCATION", params)
+        df = _fetch_frame(cursor)
+        df['DAY'] = pd.to_datetime(df['DAY'])
+        return df
+    except Exception as e:
+        print(f"Error fetching daily rollup: {e}")
+        return pd.DataFrame(columns=DAILY_COLUMNS)
+
+
+class AirQualitySnapshot:
+    """
+    Local copy of the latest-per-DATE rows that is refreshed incrementally.
+
+    Only rows with a RECORD_TIMESTAMP above the high-water mark are fetched on
+    refresh, so the cost of a refresh follows the size of the newest ETL batch.
+
+    Parameters:
+        columns (list or None): Columns to keep, defaults to all of them. LOCATION, DATE
+            and RECORD_TIMESTAMP are always included since refreshes are keyed on them.
+        locations (list or None): Only hold these LOCATIONs, all of them when None.
+    """
+
+    def __init__(self, columns=None, locations=None):
+        self._lock = threading.Lock()
+        self.columns = None
+        if columns is not None:
+            self.columns = KEY_COLUMNS + [c for c in columns if c not in KEY_COLUMNS]
+        self.locations = list(locations) if locations is not None else None
+        self.df = None
+        self.start = None
+        self.high_water = None
+
+    def refresh(self, conn, start=None, fetch=None):
+        """
+        Bring the snapshot up to date with the warehouse.
+
+        Parameters:
+            conn: DB-API connection.
+            start (date or None): Inclusive lower bound on DATE.
+            fetch (callable or None): Stand-in for fetch_data with the same signature.
+
+        Returns:
+            df (pandas.DataFrame): Latest record per DATE since `start`.
+        """
+        fetch = fetch or fetch_data
+        with self._lock:
+            # A window that moves backwards needs rows the snapshot never held
+            needs_full_load = (
+                self.df is None or self.df.empty
+                or (start is None) != (self.start is None)
+                or (start is not None and start < self.start)
+            )
+            if needs_full_load:
+                self.df = fetch(conn, start=start, columns=self.columns, locations=self.locations)
+            else:
+                new_rows = fetch(conn, start=start, columns=self.columns, since=self.high_water, locations=self.locations)
+                self.df = merge_latest(self.df, new_rows, start)
+            self.start = start
+            if not self.df.empty:
+                self.high_water = self.df['RECORD_TIMESTAMP'].max()
+            return self.df
+
+
+def fetch_load_stats(conn, dialect=SNOWFLAKE):
+    """
+    Per-day row counts of the deduplicated table, computed in one aggregate query.
+
+    Only one row per day leaves the database, so the cost for the caller
+    does not grow with the number of hourly rows stored.
+
+    Parameters:
+        conn: DB-API connection.
+        dialect (Dialect): SQL dialect of the connection.
+
+    Returns:
+        df (pandas.DataFrame): DAY, FORECAST_ROWS (distinct LOCATION and DATE pairs, as after
+            deduplication) and LAST_RECORD (newest RECORD_TIMESTAMP), sorted by DAY.
+    """
+    try:
+        day = dialect.day_of.format('DATE')
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {day} AS DAY, COUNT(*) AS FORECAST_ROWS, MAX(LAST_RECORD) AS LAST_RECORD
+            FROM (
+                SELECT LOCATION, DATE, MAX(RECORD_TIMESTAMP) AS LAST_RECORD
+                FROM {AIR_QUALITY_TABLE}
+                GROUP BY LOCATION, DATE
+            ) AS FORECASTS
+            GROUP BY {day}
+            ORDER BY DAY
+        """)
+        df = _fetch_frame(cursor)
+        df['DAY'] = pd.to_datetime(df['DAY'])
+        df['LAST_RECORD'] = pd.to_datetime(df['LAST_RECORD'])
+        return df
+    except Exception as e:
+        print(f"Error fetching load statistics: {e}")
+        return pd.DataFrame(columns=['DAY', 'FORECAST_ROWS', 'LAST_RECORD'])
+
+
+def fetch_forecast_accuracy(conn, location=None, start=None, end=None, dialect=SNOWFLAKE):
+    """
+    Error of every forecast version against the latest forecast of the same DATE, by lead time.
+
+    Superseded versions come from AIR_QUALITY_ARCHIVE and from rows of
+    AIR_QUALITY_DATA not yet compacted. Each version is paired with the latest
+    one by a window over (LOCATION, DATE) rather than a self-join, and the
+    aggregation runs in the database, so one row per lead hour leaves it
+    however long the history is.
+
+    Parameters:
+        conn: DB-API connection.
+        location (str or None): Only score this LOCATION, every location when None.
+        start (datetime or None): Inclusive lower bound on DATE.
+        end (datetime or None): Exclusive upper bound on DATE.
+        dialect (Dialect): SQL dialect of the connection.
+
+    Returns:
+        df (pandas.DataFrame): LEAD_HOURS (hours between the forecast and DATE), PAIRS
+            (versions compared), and {pollutant}_MAE and {pollutant}_BIAS (mean absolute
+            and mean signed error) per pollutant, sorted by LEAD_HOURS.
+    """
+    columns = ['LEAD_HOURS', 'PAIRS'] + [f'{p}_{stat}' for p in POLLUTANT_COLUMNS for stat in ('MAE', 'BIAS')]
+    try:
+        select_list = ', '.join(['LOCATION', 'DATE', 'RECORD_TIMESTAMP'] + POLLUTANT_COLUMNS)
+        where, params = _date_filter(start, end, dialect, locations=[location] if location is not None else None)
+        lead_hours = dialect.hours_between.format('RECORD_TIMESTAMP', 'DATE')
+        newest = "OVER (PARTITION BY LOCATION, DATE ORDER BY RECORD_TIMESTAMP DESC)"
+        latest = ', '.join(f'FIRST_VALUE({c}) {newest} AS LATEST_{c}' for c in ['RECORD_TIMESTAMP'] + POLLUTANT_COLUMNS)
+        errors = ', '.join(
+            f'AVG(ABS({p} - LATEST_{p})) AS {p}_MAE, AVG({p} - LATEST_{p}) AS {p}_BIAS' for p in POLLUTANT_COLUMNS
+        )
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {lead_hours} AS LEAD_HOURS, COUNT(*) AS PAIRS, {errors}
+            FROM (
+                SELECT {select_list}, {latest}
+                FROM (
+                    SELECT {select_list} FROM {AIR_QUALITY_ARCHIVE_TABLE} {where}
+                    UNION ALL
+                    SELECT {select_list} FROM {AIR_QUALITY_TABLE} {where}
+                ) AS VERSIONS
+            ) AS PAIRED
+            WHERE RECORD_TIMESTAMP < LATEST_RECORD_TIMESTAMP AND DATE >= RECORD_TIMESTAMP
+            GROUP BY {lead_hours}
+            ORDER BY LEAD_HOURS
+        """, params * 2)
+        df = _fetch_frame(cursor)
+        df.columns = columns
+        return df
+    except Exception as e:
+        print(f"Error fetching forecast accuracy: {e}")
+        return pd.DataFrame(columns=columns)
+
+
+def table_storage_bytes(conn, table=AIR_QUALITY_TABLE, dialect=SNOWFLAKE):
+    """
+    Storage used by a table according to the database's own metadata.
+
+    Parameters:
+        conn: DB-API connection.
+        table (str): Table name.
+        dialect (Dialect): SQL dialect of the connection.
+
+    Returns:
+        int or None: Size in bytes, None if the metadata is unavailable.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute(dialect.storage_bytes.format(table=table))
+        row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+    except Exception as e:
+        print(f"Error fetching storage size of {table}: {e}")
+        return None
+
+
+def latest_record_timestamp(conn):
+    """
+    Fetch the newest RECORD_TIMESTAMP, used as the version of the loaded data.
+
+    Parameters:
+        conn: DB-API connection.
+
+    Returns:
+        datetime or None: The most recent load time, None if the table is empty or unreachable.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT MAX(RECORD_TIMESTAMP) FROM {AIR_QUALITY_TABLE}")
+        value = cursor.fetchone()[0]
+        return pd.Timestamp(value) if value is not None else None
+    except Exception as e:
+        print(f"Error fetching latest record timestamp: {e}")
+        return None
@@ -1,55 +1,40 @@
+import argparse
 import json
-import snowflake.connector
-import requests
+import logging
+import re
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import os
 
+from database import (
+    AIR_QUALITY_ARCHIVE_TABLE, AIR_QUALITY_COLUMNS, AIR_QUALITY_TABLE, BACKENDS, DAILY_COLUMNS, DAILY_TABLE, SNOWFLAKE, STORAGE_BACKEND,
+    TIMESTAMP_FORMAT, connect_to_snowflake, get_backend, refresh_daily_rollup
+)
+from export import EXPORT_DIR, export_snapshot
+from openweathermap import (
+    LOCATIONS_FILE, MAX_WORKERS, GeocodeCache, OpenWeatherMapClient, describe_error, extract_locations, load_locations,
+    make_session
+)
+
 load_dotenv()  # take environment variables from .env.
 
-API_KEY = os.getenv('API_KEY')
-
-CITY = 'Phoenix,US'
-ZIP = '85254,US'  # Example zip code
-
-def get_coordinates(city=None, zip_code=None):
-    if city:
-        response = requests.get(f'http://api.openweathermap.org/geo/1.0/direct?q={city}&limit=1&appid={API_KEY}')
-        location_data = response.json()
-        return location_data[0]['lat'], location_data[0]['lon']
-    elif zip_code:
-        response = requests.get(f'http://api.openweathermap.org/geo/1.0/zip?zip={zip_code}&appid={API_KEY}')
-        location_data = response.json()
-        return location_data['lat'], location_data['lon']
-    else:
-        raise ValueError("Either a city or a zip code must be provided.")
-
-LAT, LON = get_coordinates(city=CITY)  # Or get_coordinates(zip_code=ZIP)
-
-response = requests.get(f'http://api.openweathermap.org/data/2.5/weather?lat={LAT}&lon={LON}&appid={API_KEY}')
-response2 = requests.get(f'http://api.openweathermap.org/data/2.5/air_pollution/forecast?lat={LAT}&lon={LON}&appid={API_KEY}')
-data = response.json()
-data2 = response2.json()
-
-
-with open(r'C:\Users\Dan\Desktop\Coding\phx_pollen_tracker\data\weather_data.json', 'w') as f:
-    json.dump(data, f)
-with open(r'C:\Users\Dan\Desktop\Coding\phx_pollen_tracker\data\pollen_data.json', 'w') as f:
-    json.dump(data2, f)
-
-conn = snowflake.connector.connect(
-    user=os.getenv('SNOWFLAKE_USER'),
-    password=os.getenv('SNOWFLAKE_PASSWORD'),
-    account=os.getenv('SNOWFLAKE_ACCOUNT'),
-    database=os.getenv('SNOWFLAKE_DATABASE'),
-    schema=os.getenv('SNOWFLAKE_SCHEMA')
-)
-# Create cursor
-cur = conn.cursor()
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+logger = logging.getLogger('etl')
+
+# Rows copied per round trip when seeding a local replica
+REPLICATE_BATCH_ROWS = 50000
+# Stored LON/LAT are the air pollution endpoint's rounding of the geocoded coordinates
+LOCATION_MATCH_DEGREES = 0.01
 
-# Create table if not exists
-cur.execute("""
+# Keys of each forecast's 'components' object, in table column order
+AIR_QUALITY_COMPONENTS = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+
+WEATHER_DDL = """
     CREATE TABLE IF NOT EXISTS WEATHER_DATA (
         LON FLOAT,
         LAT FLOAT,
@@ -73,11 +58,11 @@ cur.execute("""
         CITY_NAME VARCHAR,
         RECORD_TIMESTAMP TIMESTAMP_NTZ
     )
-""")
+"""
 
-# Create table if not exists
-cur.execute("""
-    CREATE TABLE IF NOT EXISTS AIR_QUALITY_DATA (
+AIR_QUALITY_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {AIR_QUALITY_TABLE} (
+        LOCATION VARCHAR,
         LON FLOAT,
         LAT FLOAT,
         DATE TIMESTAMP_NTZ,
@@ -92,86 +77,664 @@ cur.execute("""
         NH3 FLOAT,
         RECORD_TIMESTAMP TIMESTAMP_NTZ
     )
-""")
-
-# Extract individual values from the data dictionary
-weather_data = [
-    data['coord']['lon'],
-    data['coord']['lat'],
-    data['weather'][0]['id'],
-    data['weather'][0]['main'],
-    data['weather'][0]['description'],
-    data['weather'][0]['icon'],
-    data['main']['temp'],
-    data['main']['feels_like'],
-    data['main']['temp_min'],
-    data['main']['temp_max'],
-    data['main']['pressure'],
-    data['main']['humidity'],
-    data['wind']['speed'],
-    data['wind']['deg'],
-    data['wind'].get('gust', None),  # use get method to handle optional field
-    data['clouds']['all'],
-    data['sys']['country'],
-    pd.to_datetime(data['sys']['sunrise'], unit='s').strftime('%Y-%m-%d %H:%M:%S'),  # convert UNIX timestamp to datetime and then to string
-    pd.to_datetime(data['sys']['sunset'], unit='s').strftime('%Y-%m-%d %H:%M:%S'),  # convert UNIX timestamp to datetime and then to string
-    data['name']
-]
-
-# Add timestamp to the weather_data
-timestamp = datetime.now()
-weather_data.append(timestamp)
-
-# Modify your INSERT statement to include the RECORD_TIMESTAMP
-cur.execute("""
-    INSERT INTO WEATHER_DATA (
-        LON, LAT, WEATHER_ID, MAIN, DESCRIPTION, ICON, TEMP, FEELS_LIKE, TEMP_MIN, TEMP_MAX, PRESSURE, HUMIDITY,
-        WIND_SPEED, WIND_DEG, WIND_GUST, CLOUDS_ALL, COUNTRY, SUNRISE, SUNSET, CITY_NAME, RECORD_TIMESTAMP
+"""
+
+# Same shape as AIR_QUALITY_DATA; keeps every forecast that was replaced by a newer run
+ARCHIVE_DDL = AIR_QUALITY_DDL.replace(AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE, 1)
+
+# Physical layout on (LOCATION, day), so loads and dashboard queries touch only the
+# partitions of the locations and days they ask for. DuckDB needs nothing: the ETL
+# appends rows in DATE order and its row-group zone maps already prune on DATE.
+CLUSTERING_DDL = {
+    'snowflake': [f"ALTER TABLE {AIR_QUALITY_TABLE} CLUSTER BY (LOCATION, TO_DATE(DATE))"],
+    'sqlite': [f"CREATE INDEX IF NOT EXISTS IDX_AIR_QUALITY_LOCATION_DATE ON {AIR_QUALITY_TABLE} (LOCATION, DATE)"],
+}
+
+# Run after compaction to reclaim the space of deleted rows. DuckDB keeps them as
+# tombstones that every scan skips over until the next checkpoint rewrites the row groups.
+RECLAIM_DDL = {
+    'duckdb': ['CHECKPOINT'],
+}
+
+# Materialized by the ETL so the dashboard summaries never scan hourly history
+DAILY_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {DAILY_TABLE} (
+        LOCATION VARCHAR,
+        LON FLOAT,
+        LAT FLOAT,
+        DAY DATE,
+        HOURS NUMBER,
+        {', '.join(f'{column} FLOAT' for column in DAILY_COLUMNS[5:])}
     )
-    VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+"""
+
+# Snowflake type names the other dialects spell differently. DuckDB's FLOAT is single
+# precision, which would break the coordinate equality used by the upsert.
+DDL_TYPES = {
+    'duckdb': {'TIMESTAMP_NTZ': 'TIMESTAMP', 'NUMBER': 'BIGINT', 'FLOAT': 'DOUBLE'},
+}
+
+def render_ddl(ddl, dialect=SNOWFLAKE):
+    """Rewrite the column types of a CREATE TABLE statement for a dialect."""
+    for snowflake_type, local_type in DDL_TYPES.get(dialect.name, {}).items():
+        ddl = re.sub(rf'\b{snowflake_type}\b', local_type, ddl)
+    return ddl
+
+def transform_weather(data, run_timestamp):
+    """
+    Flatten a current weather payload into a WEATHER_DATA row.
+
+    Parameters:
+        data (dict): Response of the /data/2.5/weather endpoint.
+        run_timestamp (datetime): RECORD_TIMESTAMP of this ETL run.
+
+    Returns:
+        tuple: Values in WEATHER_DATA column order.
+    """
+    return (
+        data['coord']['lon'],
+        data['coord']['lat'],
+        data['weather'][0]['id'],
+        data['weather'][0]['main'],
+        data['weather'][0]['description'],
+        data['weather'][0]['icon'],
+        data['main']['temp'],
+        data['main']['feels_like'],
+        data['main']['temp_min'],
+        data['main']['temp_max'],
+        data['main']['pressure'],
+        data['main']['humidity'],
+        data['wind']['speed'],
+        data['wind']['deg'],
+        data['wind'].get('gust', None),  # use get method to handle optional field
+        data['clouds']['all'],
+        data['sys']['country'],
+        pd.to_datetime(data['sys']['sunrise'], unit='s').strftime(TIMESTAMP_FORMAT),  # convert UNIX timestamp to datetime and then to string
+        pd.to_datetime(data['sys']['sunset'], unit='s').strftime(TIMESTAMP_FORMAT),  # convert UNIX timestamp to datetime and then to string
+        data['name'],
+        run_timestamp
     )
-""", tuple(weather_data))
-
-# Iterate through the list of forecasts in the air quality data
-for forecast in data2['list']:
-    # Extract individual values from the forecast dictionary
-    air_quality_data = [
-        data2['coord']['lon'],
-        data2['coord']['lat'],
-        pd.to_datetime(forecast['dt'], unit='s').strftime('%Y-%m-%d %H:%M:%S'),  # convert UNIX timestamp to datetime and then to string
-        forecast['main']['aqi'],
-        forecast['components']['co'],
-        forecast['components']['no'],
-        forecast['components']['no2'],
-        forecast['components']['o3'],
-        forecast['components']['so2'],
-        forecast['components']['pm2_5'],
-        forecast['components']['pm10'],
-        forecast['components']['nh3']
-    ]
-
-    # Add timestamp to the air_quality_data
-    timestamp = datetime.now()
-    air_quality_data.append(timestamp)
-
-    # Modify your INSERT statement to include the RECORD_TIMESTAMP
-    cur.execute("""
-        INSERT INTO AIR_QUALITY_DATA (
-            LON, LAT, DATE, AQI, CO, NO, NO2, O3, SO2, PM2_5, PM10, NH3, RECORD_TIMESTAMP
+
+def location_label(lon, lat):
+    """LOCATION of rows whose location name is unknown."""
+    return f"{lat:.4f},{lon:.4f}"
+
+def resolve_sites(locations, client=None):
+    """
+    Coordinates of the tracked locations, from the geocode cache or geocoded once.
+
+    Parameters:
+        locations (list): Location tuples, as read from locations.json.
+        client (OpenWeatherMapClient or None): Client whose geocode cache is used, a new one by default.
+
+    Returns:
+        list: (name, lat, lon) of every location whose coordinates could be resolved.
+    """
+    client = client or OpenWeatherMapClient(geocode_cache=GeocodeCache())
+    sites = []
+    for location in locations:
+        try:
+            lat, lon = client.get_coordinates(city=location.city, zip_code=location.zip_code)
+        except Exception as e:
+            logger.warning(f"Could not resolve the coordinates of {location.name}: {describe_error(e)}")
+            continue
+        sites.append((location.name, lat, lon))
+    client.geocode_cache.save()
+    return sites
+
+def nearest_site(lon, lat, sites):
+    """
+    Name of the tracked location stored rows at (lon, lat) belong to.
+
+    The air pollution endpoint echoes the requested coordinates rounded, so
+    the match allows LOCATION_MATCH_DEGREES of difference.
+
+    Returns:
+        str or None: None when no site is close enough.
+    """
+    distance, name = min(
+        ((max(abs(site_lat - lat), abs(site_lon - lon)), name) for name, site_lat, site_lon in sites),
+        default=(None, None)
+    )
+    return name if distance is not None and distance <= LOCATION_MATCH_DEGREES else None
+
+def transform_air_quality(payloads, run_timestamp, locations=None):
+    """
+    Flatten air pollution forecast payloads into one typed AIR_QUALITY_DATA frame.
+
+    All entries of all payloads are converted column by column, so the epoch
+    to timestamp conversion runs once over the whole batch instead of once per row.
+
+    Parameters:
+        payloads (dict or list): One or more responses of the /data/2.5/air_pollution/forecast endpoint.
+        run_timestamp (datetime): RECORD_TIMESTAMP shared by every row of this run.
+        locations (list or None): Location name of each payload, coordinates are used when missing.
+
+    Returns:
+        df (pandas.DataFrame): Columns in AIR_QUALITY_COLUMNS order, typed like the table.
+    """
+    if isinstance(payloads, dict):
+        payloads = [payloads]
+    if locations is None:
+        locations = [location_label(payload['coord']['lon'], payload['coord']['lat']) for payload in payloads]
+    entries = [forecast for payload in payloads for forecast in payload['list']]
+    counts = [len(payload['list']) for payload in payloads]
+
+    components = pd.DataFrame.from_records(
+        [forecast['components'] for forecast in entries], columns=AIR_QUALITY_COMPONENTS
+    ).astype('float64')
+    components.columns = [component.upper() for component in AIR_QUALITY_COMPONENTS]
+
+    df = pd.DataFrame({
+        'LOCATION': np.repeat(np.array(locations, dtype=object), counts),
+        'LON': np.repeat([payload['coord']['lon'] for payload in payloads], counts).astype('float64'),
+        'LAT': np.repeat([payload['coord']['lat'] for payload in payloads], counts).astype('float64'),
+        'DATE': pd.to_datetime(np.fromiter((forecast['dt'] for forecast in entries), dtype='int64', count=len(entries)), unit='s'),
+        'AQI': np.fromiter((forecast['main']['aqi'] for forecast in entries), dtype='int64', count=len(entries)),
+    })
+    df = pd.concat([df, components], axis=1)
+    df['RECORD_TIMESTAMP'] = pd.Timestamp(run_timestamp)
+    return df[AIR_QUALITY_COLUMNS]
+
+def frame_to_rows(df):
+    """
+    Convert a typed AIR_QUALITY_DATA frame into tuples of plain Python values for executemany.
+
+    Parameters:
+        df (pandas.DataFrame): Output of transform_air_quality().
+
+    Returns:
+        list: Tuples in AIR_QUALITY_COLUMNS order.
+    """
+    columns = []
+    for column in AIR_QUALITY_COLUMNS:
+        if column == 'DATE':
+            columns.append(df[column].dt.strftime(TIMESTAMP_FORMAT).tolist())
+        elif column == 'RECORD_TIMESTAMP':
+            columns.append(df[column].dt.strftime(TIMESTAMP_FORMAT + '.%f').tolist())
+        else:
+            columns.append(df[column].tolist())
+    return list(zip(*columns))
+
+def load_weather(conn, rows, dialect=SNOWFLAKE):
+    """
+    Insert WEATHER_DATA rows with a single executemany call.
+
+    Parameters:
+        conn: DB-API connection.
+        rows (list): Outputs of transform_weather().
+        dialect (Dialect): SQL dialect of the connection.
+    """
+    if not rows:
+        return
+    placeholders = ', '.join([dialect.placeholder] * len(rows[0]))
+    cur = conn.cursor()
+    cur.executemany(f"""
+        INSERT INTO WEATHER_DATA (
+            LON, LAT, WEATHER_ID, MAIN, DESCRIPTION, ICON, TEMP, FEELS_LIKE, TEMP_MIN, TEMP_MAX, PRESSURE, HUMIDITY,
+            WIND_SPEED, WIND_DEG, WIND_GUST, CLOUDS_ALL, COUNTRY, SUNRISE, SUNSET, CITY_NAME, RECORD_TIMESTAMP
         )
-        VALUES (
-            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+        VALUES ({placeholders})
+    """, rows)
+    conn.commit()
+
+def insert_air_quality_sql(dialect=SNOWFLAKE, table=AIR_QUALITY_TABLE):
+    p = dialect.placeholder
+    return f"INSERT INTO {table} ({', '.join(AIR_QUALITY_COLUMNS)}) VALUES ({', '.join([p] * len(AIR_QUALITY_COLUMNS))})"
+
+def load_air_quality(conn, batch, dialect=SNOWFLAKE):
+    """
+    Upsert a batch of forecast rows in a single transaction.
+
+    For each location in the batch, the forecasts already stored for the
+    batch's DATE range are moved to AIR_QUALITY_ARCHIVE and replaced, so
+    AIR_QUALITY_DATA only holds the latest forecast and re-running the ETL is
+    idempotent. The rows are then sent with one executemany call, which the
+    Snowflake connector turns into a single multi-row INSERT.
+
+    Parameters:
+        conn: DB-API connection (Snowflake, or SQLite/DuckDB when benchmarking).
+        batch (pandas.DataFrame): Output of transform_air_quality().
+        dialect (Dialect): SQL dialect of the connection.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    if batch.empty:
+        return 0
+    date_ranges = batch.groupby('LOCATION')['DATE'].agg(['min', 'max'])
+    rows = frame_to_rows(batch)
+
+    p = dialect.placeholder
+    columns = ', '.join(AIR_QUALITY_COLUMNS)
+    replaced = f"WHERE LOCATION = {p} AND DATE BETWEEN {p} AND {p}"
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        for location, low, high in date_ranges.itertuples(name=None):
+            params = (location, low.strftime(TIMESTAMP_FORMAT), high.strftime(TIMESTAMP_FORMAT))
+            cur.execute(
+                f"INSERT INTO {AIR_QUALITY_ARCHIVE_TABLE} ({columns}) SELECT {columns} FROM {AIR_QUALITY_TABLE} {replaced}",
+                params
+            )
+            cur.execute(f"DELETE FROM {AIR_QUALITY_TABLE} {replaced}", params)
+        cur.executemany(insert_air_quality_sql(dialect), rows)
+        # Transaction control goes through the cursor, which DuckDB runs on its own connection
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return len(rows)
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+def log_event(event, **fields):
+    """Emit one structured log line as JSON."""
+    logger.info(json.dumps({'event': event, **fields}, default=str))
+
+@contextmanager
+def timed_stage(name, stages):
+    """
+    Time a pipeline stage and record it.
+
+    The body can set stage['rows'] to report how many rows it handled.
+
+    Parameters:
+        name (str): Stage name.
+        stages (list): Receives the stage record when the block exits.
+    """
+    stage = {'stage': name, 'rows': None}
+    start = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage['seconds'] = round(time.perf_counter() - start, 4)
+        stages.append(stage)
+        log_event('stage', **stage)
+
+def create_tables(conn, dialect=SNOWFLAKE):
+    cur = conn.cursor()
+    for ddl in (WEATHER_DDL, AIR_QUALITY_DDL, ARCHIVE_DDL, DAILY_DDL):
+        cur.execute(render_ddl(ddl, dialect))
+    cur.close()
+
+def _table_columns(cur, table):
+    cur.execute(f"SELECT * FROM {table} WHERE 1 = 0")
+    return [column[0].upper() for column in cur.description]
+
+def _affected_rows(cur):
+    # DuckDB reports the count of a DELETE as a result row instead of rowcount
+    return cur.rowcount if cur.rowcount >= 0 else cur.fetchone()[0]
+
+def add_location_key(conn, dialect=SNOWFLAKE, sites=()):
+    """
+    Add the LOCATION column to tables created before it existed, and fill it in.
+
+    Existing rows take the locations.json name of the nearest tracked site, the
+    same name the ETL gives new rows, or a coordinate label when none is close.
+
+    Parameters:
+        conn: DB-API connection.
+        dialect (Dialect): SQL dialect of the connection.
+        sites (list): (name, lat, lon) of the tracked locations, see resolve_sites().
+
+    Returns:
+        int: Number of coordinates backfilled.
+    """
+    p = dialect.placeholder
+    cur = conn.cursor()
+    for table in (AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE):
+        if 'LOCATION' not in _table_columns(cur, table):
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN LOCATION VARCHAR")
+    # The rollup is rebuilt by migrate(), it only needs the column
+    if 'LOCATION' not in _table_columns(cur, DAILY_TABLE):
+        cur.execute(f"ALTER TABLE {DAILY_TABLE} ADD COLUMN LOCATION VARCHAR")
+
+    coordinates = set()
+    for table in (AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE):
+        cur.execute(f"SELECT DISTINCT LON, LAT FROM {table} WHERE LOCATION IS NULL")
+        coordinates.update(cur.fetchall())
+    try:
+        cur.execute("BEGIN")
+        for lon, lat in coordinates:
+            name = nearest_site(lon, lat, sites) or location_label(lon, lat)
+            for table in (AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE):
+                cur.execute(
+                    f"UPDATE {table} SET LOCATION = {p} WHERE LON = {p} AND LAT = {p} AND LOCATION IS NULL",
+                    (name, lon, lat)
+                )
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return len(coordinates)
+
+def compact(conn, dialect=SNOWFLAKE, archive_retention_days=None):
+    """
+    Move superseded forecasts out of AIR_QUALITY_DATA into AIR_QUALITY_ARCHIVE.
+
+    A row is superseded when a newer RECORD_TIMESTAMP exists for the same
+    LOCATION and DATE. The loader already archives what each run replaces, so
+    this job cleans up history loaded before that, or by other writers.
+
+    Parameters:
+        conn: DB-API connection.
+        dialect (Dialect): SQL dialect of the connection.
+        archive_retention_days (int or None): Also purge archived forecasts made more than
+            this many days ago, keep them forever when None.
+
+    Returns:
+        dict: Rows archived and rows purged from the archive.
+    """
+    columns = ', '.join(AIR_QUALITY_COLUMNS)
+    superseded = f"""
+        WHERE EXISTS (
+            SELECT 1 FROM {AIR_QUALITY_TABLE} AS NEWER
+            WHERE NEWER.LOCATION = {AIR_QUALITY_TABLE}.LOCATION
+              AND NEWER.DATE = {AIR_QUALITY_TABLE}.DATE
+              AND NEWER.RECORD_TIMESTAMP > {AIR_QUALITY_TABLE}.RECORD_TIMESTAMP
         )
-    """, tuple(air_quality_data))
+    """
+    result = {'archived': 0, 'purged': 0}
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute(f"INSERT INTO {AIR_QUALITY_ARCHIVE_TABLE} ({columns}) SELECT {columns} FROM {AIR_QUALITY_TABLE} {superseded}")
+        cur.execute(f"DELETE FROM {AIR_QUALITY_TABLE} {superseded}")
+        result['archived'] = _affected_rows(cur)
+        if archive_retention_days is not None:
+            cutoff = datetime.now() - timedelta(days=archive_retention_days)
+            cur.execute(
+                f"DELETE FROM {AIR_QUALITY_ARCHIVE_TABLE} WHERE RECORD_TIMESTAMP < {dialect.placeholder}",
+                (cutoff.strftime(TIMESTAMP_FORMAT),)
+            )
+            result['purged'] = _affected_rows(cur)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    for statement in RECLAIM_DDL.get(dialect.name, []):
+        cur.execute(statement)
+    log_event('compact', backend=dialect.name, **result)
+    return result
+
+def migrate(conn, dialect=SNOWFLAKE, sites=()):
+    """
+    Create the warehouse tables. Run once per environment, not on every ETL run.
+
+    Tables created before the LOCATION key get the column and a backfill, then
+    AIR_QUALITY_DATA is clustered on (LOCATION, day). The daily rollup is
+    rebuilt per location from the full history, so migrating an existing
+    deployment backfills it.
+
+    Parameters:
+        conn: DB-API connection.
+        dialect (Dialect): SQL dialect of the connection.
+        sites (list): (name, lat, lon) of the tracked locations, names the backfilled history.
+    """
+    create_tables(conn, dialect)
+    backfilled = add_location_key(conn, dialect, sites)
+    cur = conn.cursor()
+    for statement in CLUSTERING_DDL.get(dialect.name, []):
+        cur.execute(statement)
+    cur.close()
+    refresh_daily_rollup(conn, None, dialect)
+    log_event('migrate', backend=dialect.name, backfilled_locations=backfilled,
+              tables=['WEATHER_DATA', AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE, DAILY_TABLE])
+
+def replicate(source, target, dialect, batch_rows=REPLICATE_BATCH_ROWS):
+    """
+    Seed a local replica with the full AIR_QUALITY_DATA and AIR_QUALITY_ARCHIVE history of the primary backend.
+
+    Rows are streamed in batches, so the copy never holds a whole table in
+    memory. The replica's copies are replaced in one transaction and its daily
+    rollup rebuilt; later ETL runs keep it current with --replica. The archive
+    is copied too, the forecast accuracy of the Trends page is read from it.
+
+    Parameters:
+        source: DB-API connection to the primary backend.
+        target: DB-API connection to the replica.
+        dialect (Dialect): SQL dialect of the replica.
+        batch_rows (int): Rows fetched and inserted per round trip.
+
+    Returns:
+        dict: Number of rows copied per table.
+    """
+    create_tables(target, dialect)
+    src = source.cursor()
+    cur = target.cursor()
+    copied = {}
+    try:
+        cur.execute("BEGIN")
+        for table in (AIR_QUALITY_TABLE, AIR_QUALITY_ARCHIVE_TABLE):
+            src.execute(f"SELECT {', '.join(AIR_QUALITY_COLUMNS)} FROM {table}")
+            cur.execute(f"DELETE FROM {table}")
+            copied[table] = 0
+            while True:
+                rows = src.fetchmany(batch_rows)
+                if not rows:
+                    break
+                cur.executemany(insert_air_quality_sql(dialect, table), rows)
+                copied[table] += len(rows)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    refresh_daily_rollup(target, None, dialect)
+    log_event('replicate', backend=dialect.name, rows=copied)
+    return copied
+
+def extract(locations, client=None, max_workers=MAX_WORKERS):
+    """
+    Fetch the raw payloads of every location.
 
-# Commit the transaction
-conn.commit()
+    Returns:
+        (list, dict, OpenWeatherMapClient): Results, failures by location name, and the client used.
+    """
+    client = client or OpenWeatherMapClient(session=make_session(pool_size=max_workers), geocode_cache=GeocodeCache())
+    results, errors = extract_locations(locations, client, max_workers)
+    return results, errors, client
 
+def write_raw(results, output_dir):
+    """
+    Keep a copy of the raw payloads, one directory per location.
 
-# Commit the transaction
-conn.commit()
+    Returns:
+        int: Number of files written.
+    """
+    written = 0
+    for result in results:
+        location_dir = os.path.join(output_dir, slugify(result['location'].name))
+        os.makedirs(location_dir, exist_ok=True)
+        with open(os.path.join(location_dir, 'weather_data.json'), 'w') as f:
+            json.dump(result['weather'], f)
+        with open(os.path.join(location_dir, 'pollen_data.json'), 'w') as f:
+            json.dump(result['air_pollution'], f)
+        written += 2
+    return written
+
+def transform(results, run_timestamp):
+    """
+    Turn the raw payloads into table rows.
+
+    Returns:
+        (list, pandas.DataFrame): WEATHER_DATA rows and the AIR_QUALITY_DATA frame.
+    """
+    weather_rows = [transform_weather(result['weather'], run_timestamp) for result in results]
+    air_quality = transform_air_quality(
+        [result['air_pollution'] for result in results], run_timestamp, [result['location'].name for result in results]
+    )
+    return weather_rows, air_quality
+
+def load(conn, weather_rows, air_quality, dialect, stages):
+    """
+    Load one transformed batch into a backend and refresh the days it touched.
+
+    Parameters:
+        conn: DB-API connection.
+        weather_rows (list): WEATHER_DATA rows.
+        air_quality (pandas.DataFrame): AIR_QUALITY_DATA batch.
+        dialect (Dialect): SQL dialect of the connection.
+        stages (list): Receives the stage records.
+    """
+    with timed_stage('load_weather', stages) as stage:
+        stage['backend'] = dialect.name
+        load_weather(conn, weather_rows, dialect)
+        stage['rows'] = len(weather_rows)
+    with timed_stage('load_air_quality', stages) as stage:
+        stage['backend'] = dialect.name
+        stage['rows'] = load_air_quality(conn, air_quality, dialect)
+    with timed_stage('daily_rollup', stages) as stage:
+        stage['backend'] = dialect.name
+        # Only the days this batch touched are recomputed
+        refresh_daily_rollup(conn, air_quality['DATE'].min(), dialect)
+        stage['rows'] = air_quality['DATE'].dt.normalize().nunique()
+
+def run_pipeline(locations, connect=connect_to_snowflake, dialect=SNOWFLAKE, client=None,
+                 output_dir=DATA_DIR, max_workers=MAX_WORKERS, replicas=(), export_dir=None):
+    """
+    Run extract -> transform -> load once and report where the time went.
+
+    Parameters:
+        locations (list): Location tuples to process.
+        connect (callable): Returns a DB-API connection, or None if the database is unreachable.
+        dialect (Dialect): SQL dialect of that connection.
+        client (OpenWeatherMapClient or None): API client, a pooled one with the geocode cache by default.
+        output_dir (str or None): Where raw payloads are written, None to skip writing them.
+        max_workers (int): Number of locations extracted concurrently.
+        replicas (iterable): Backends that receive the same batch after the primary one.
+        export_dir (str or None): Also pre-render the Home page of every location to this
+            directory once the batch is loaded, None to skip it.
+
+    Returns:
+        dict: Run timestamp, per-stage timings and row counts, and failed locations.
+    """
+    stages = []
+    run_start = time.perf_counter()
+    # One timestamp for the whole run, so every row of this batch shares the same version
+    run_timestamp = datetime.now()
+
+    with timed_stage('extract', stages) as stage:
+        results, errors, client = extract(locations, client, max_workers)
+        stage['rows'] = len(results)
+        stage['api_calls'] = client.calls
+        stage['geocode_hit_rate'] = round(client.geocode_cache.hit_rate(), 3)
+    if not results:
+        raise RuntimeError(f"No location could be extracted: {', '.join(sorted(errors))}")
+
+    if output_dir:
+        with timed_stage('write_raw', stages) as stage:
+            stage['rows'] = write_raw(results, output_dir)
+
+    with timed_stage('transform', stages) as stage:
+        weather_rows, air_quality = transform(results, run_timestamp)
+        stage['rows'] = len(air_quality)
+
+    with timed_stage('connect', stages):
+        conn = connect()
+    if conn is None:
+        raise ConnectionError("Could not connect to the database")
+
+    try:
+        # Every location goes into the same batched load
+        load(conn, weather_rows, air_quality, dialect, stages)
+        if export_dir:
+            with timed_stage('export', stages) as stage:
+                try:
+                    manifest = export_snapshot(conn, dialect, export_dir)
+                    stage['rows'] = len(manifest['locations'])
+                    if manifest['failed']:
+                        stage['failed_locations'] = sorted(manifest['failed'])
+                except Exception as e:
+                    # The load is committed and the replicas still need the batch,
+                    # a failed export only leaves the previous snapshot in place
+                    stage['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        conn.close()
+
+    for replica in replicas:
+        replica_conn = replica.connect()
+        if replica_conn is None:
+            raise ConnectionError(f"Could not open the {replica.name} replica")
+        try:
+            # Creating the tables is idempotent, so a fresh replica needs no separate migration
+            create_tables(replica_conn, replica.dialect)
+            load(replica_conn, weather_rows, air_quality, replica.dialect, stages)
+        finally:
+            replica_conn.close()
+
+    metrics = {
+        'run_timestamp': run_timestamp,
+        'locations': len(locations),
+        'failed_locations': sorted(errors),
+        'total_seconds': round(time.perf_counter() - run_start, 4),
+        'stages': stages,
+    }
+    log_event('run', **{key: value for key, value in metrics.items() if key != 'stages'})
+    return metrics
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract OpenWeatherMap air quality forecasts and load them into Snowflake.")
+    parser.add_argument('command', nargs='?', choices=['run', 'migrate', 'replicate', 'compact'], default='run',
+                        help="'run' the pipeline (default), 'migrate' to create the tables once, "
+                             "'replicate' to copy the Snowflake history into the local DuckDB replica, "
+                             "or 'compact' to archive superseded forecasts")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=STORAGE_BACKEND,
+                        help="Where the pipeline loads and 'migrate' creates tables")
+    parser.add_argument('--replica', action='store_true', help="Also load each batch into the local DuckDB replica")
+    parser.add_argument('--locations', default=LOCATIONS_FILE, help="JSON file listing the locations to track")
+    parser.add_argument('--output-dir', default=DATA_DIR, help="Directory for the raw API payloads")
+    parser.add_argument('--no-raw', action='store_true', help="Do not write the raw API payloads")
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help="Locations extracted concurrently")
+    parser.add_argument('--metrics-json', help="Also write the run metrics to this file")
+    parser.add_argument('--export', nargs='?', const=EXPORT_DIR, metavar='DIR',
+                        help="After loading, pre-render the Home page of every location to static files "
+                             "(static/snapshot by default)")
+    parser.add_argument('--archive-retention-days', type=int,
+                        help="With 'compact', purge archived forecasts older than this many days")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    backend = get_backend(args.backend)
+
+    if args.command in ('migrate', 'compact'):
+        conn = backend.connect()
+        if conn is None:
+            raise ConnectionError(f"Could not connect to {backend.name}")
+        if args.command == 'migrate':
+            migrate(conn, backend.dialect, resolve_sites(load_locations(args.locations)))
+        else:
+            compact(conn, backend.dialect, args.archive_retention_days)
+        conn.close()
+        return
+
+    if args.command == 'replicate':
+        source, target = get_backend('snowflake').connect(), get_backend('duckdb').connect()
+        if source is None or target is None:
+            raise ConnectionError("Could not open both Snowflake and the DuckDB replica")
+        try:
+            replicate(source, target, get_backend('duckdb').dialect)
+        finally:
+            source.close()
+            target.close()
+        return
+
+    metrics = run_pipeline(
+        load_locations(args.locations),
+        connect=backend.connect,
+        dialect=backend.dialect,
+        output_dir=None if args.no_raw else args.output_dir,
+        max_workers=args.max_workers,
+        replicas=[get_backend('duckdb')] if args.replica and backend.name != 'duckdb' else [],
+        export_dir=args.export,
+    )
+    if args.metrics_json:
+        with open(args.metrics_json, 'w') as f:
+            json.dump(metrics, f, indent=2, default=str)
 
-# Close the cursor and connection
-cur.close()
-conn.close()
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Pre-render the Home page of every location to static HTML and JSON.
+
+Run after each ETL load (`python etl.py --export`, or `python export.py`), so
+the warehouse queries, the pandas work and the Plotly figures are paid once
+per ETL run instead of once per visitor. The snapshot can be served by any
+static file server, or by the app itself with SERVE_SNAPSHOT=1.
+
+Layout of the snapshot directory:
+    manifest.json                        Generation time, data version, one entry per location
+                                         and the locations that could not be rendered
+    <location>/index.html                The page: summary table, worst days and every day's charts
+    <location>/summary.json              The same numbers as JSON
+    <location>/figures/<day>_<metric>.json   Plotly figure specs
+"""
+import argparse
+import html
+import json
+import os
+import re
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+from aggregations import HISTORY_DAYS, PLOT_METRICS, DayIndex, daily_rollup, summary_table, worst_days
+from database import BACKENDS, STORAGE_BACKEND, fetch_daily, fetch_data, get_backend
+from figures import POLLUTANT_NAMES, UNITS, build_metric_figure
+
+# Where snapshots are written and, with SERVE_SNAPSHOT=1, read by Home.py
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'snapshot'))
+MANIFEST_FILE = 'manifest.json'
+DAYS_SHOWN = 5
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1100px; color: #262730; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ddd; padding: 0.3rem 0.6rem; text-align: right; }}
+.metric {{ font-size: 1.5rem; }}
+.delta {{ color: #7f7f7f; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Data updated: <b>{updated}</b>. Snapshot generated {generated}.</p>
+<h2>The Week Ahead:</h2>
+{summary}
+<p>The following dates have the <b>worst air quality conditions</b> for each pollutant:</p>
+<ul>{worst}</ul>
+<h2>Daily Forecasts</h2>
+{days}
+</body>
+</html>
+"""
+
+
+def location_slug(name):
+    """Directory name of a location's artifacts."""
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'location'
+
+
+def render_location(location, hourly, daily, today, generated):
+    """
+    Render one location's page and its JSON artifacts.
+
+    Parameters:
+        location (str): Location name.
+        hourly (pandas.DataFrame): Latest record per DATE of the location, with PLOT_METRICS.
+        daily (pandas.DataFrame): Daily rollup of the location.
+        today (date): Day the forecast is read from.
+        generated (datetime): Time of the export.
+
+    Returns:
+        (str, dict, dict): The HTML page, the summary payload, and figure specs by file name.
+    """
+    day_index = DayIndex(hourly, PLOT_METRICS)
+    summary_df = summary_table(daily)
+    worst = worst_days(daily, today + timedelta(days=1)).dropna()
+    updated = hourly['RECORD_TIMESTAMP'].max()
+
+    figures, sections, days = {}, [], []
+    plotly_js = 'cdn'
+    for day in sorted(day_index.recent_days(DAYS_SHOWN)):
+        metrics, charts = {}, []
+        for metric in PLOT_METRICS:
+            mean, baseline = day_index.day_mean(day, metric), day_index.baseline_mean(day, metric)
+            change = (mean - baseline) / baseline * 100 if baseline else 0
+            metrics[metric] = {'mean': round(float(mean), 4), 'change_from_last_week_pct': round(float(change), 2)}
+            fig = build_metric_figure(day_index.day(day), metric)
+            figures[f"{day:%Y-%m-%d}_{metric}.json"] = fig.to_json()
+            # plotly.js is loaded once per page, from the CDN
+            chart = fig.to_html(full_html=False, include_plotlyjs=plotly_js)
+            plotly_js = False
+            charts.append(
+                f"<h3>{metric}</h3><p>{html.escape(POLLUTANT_NAMES[metric])}</p>"
+                f"<p class=\"metric\">{mean:.2f} {UNITS[metric]} <span class=\"delta\">{change:+.2f}% from last week</span></p>"
+                f"{chart}"
+            )
+        label = day.strftime('%A, %m/%d/%Y') + (" (Today)" if day.date() == today else "")
+        sections.append(f"<details{' open' if day.date() == today else ''}><summary>{label}</summary>{''.join(charts)}</details>")
+        days.append({'day': f"{day:%Y-%m-%d}", 'metrics': metrics})
+
+    page = PAGE_TEMPLATE.format(
+        title=f"{html.escape(location)} Air Quality Forecast",
+        updated=updated.strftime('%I:%M%p'),
+        generated=generated.strftime('%m/%d/%Y %I:%M%p'),
+        summary=summary_df.to_html(float_format="{0:.2f}".format),
+        worst=''.join(f"<li><b>{html.escape(POLLUTANT_NAMES[metric])}</b>: {day:%A, %m/%d/%Y}</li>" for metric, day in worst.items()),
+        days=''.join(sections),
+    )
+    summary = {
+        'location': location,
+        'updated': updated.isoformat(),
+        'summary': {
+            metric: {datetime.strptime(day, '%m/%d/%Y').strftime('%Y-%m-%d'): round(float(value), 4) for (_, day), value in row.items()}
+            for metric, row in summary_df.iterrows()
+        },
+        'worst_days': {metric: f"{day:%Y-%m-%d}" for metric, day in worst.items()},
+        'days': days,
+    }
+    return page, summary, figures
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def export_snapshot(conn, dialect, output_dir=EXPORT_DIR, today=None):
+    """
+    Render every location to `output_dir`, replacing the previous snapshot.
+
+    The hourly window and the daily rollup of all locations are fetched in one
+    query each. A location that cannot be rendered is left out and recorded
+    under 'failed' in the manifest, the others are exported. The snapshot is
+    written next to `output_dir` and renamed into place at the end, so readers
+    never see a half-written one.
+
+    Parameters:
+        conn: DB-API connection.
+        dialect (Dialect): SQL dialect of the connection.
+        output_dir (str): Snapshot directory.
+        today (date or None): Day the forecast is read from, today by default.
+
+    Returns:
+        dict: The manifest written.
+    """
+    today = today or date.today()
+    generated = datetime.now()
+    start = today - timedelta(days=HISTORY_DAYS)
+    hourly = fetch_data(conn, start=start, columns=['LOCATION', 'DATE', 'RECORD_TIMESTAMP'] + list(PLOT_METRICS), dialect=dialect)
+    if hourly.empty:
+        raise LookupError("No air quality data to export")
+    daily = fetch_daily(conn, start=start, dialect=dialect)
+    if daily.empty:
+        # The rollup has not been materialized yet (migration pending), derive it from the hourly rows
+        daily = daily_rollup(hourly)
+
+    staging = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {
+        'generated': generated.isoformat(timespec='seconds'),
+        'data_version': hourly['RECORD_TIMESTAMP'].max().isoformat(),
+        'locations': [],
+        'failed': {},
+    }
+    for location, location_hourly in hourly.groupby('LOCATION', observed=True):
+        location = str(location)
+        slug = location_slug(location)
+        try:
+            page, summary, figures = render_location(
+                location, location_hourly, daily[daily['LOCATION'] == location], today, generated
+            )
+        except Exception as e:
+            print(f"Error exporting {location}: {e}")
+            manifest['failed'][location] = f"{type(e).__name__}: {e}"
+            continue
+        _write(os.path.join(staging, slug, 'index.html'), page)
+        _write(os.path.join(staging, slug, 'summary.json'), json.dumps(summary, indent=2))
+        for name, spec in figures.items():
+            _write(os.path.join(staging, slug, 'figures', name), spec)
+        manifest['locations'].append({'name': location, 'page': f"{slug}/index.html", 'summary': f"{slug}/summary.json"})
+    if not manifest['locations']:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RuntimeError(f"No location could be exported: {', '.join(sorted(manifest['failed']))}")
+    _write(os.path.join(staging, MANIFEST_FILE), json.dumps(manifest, indent=2))
+
+    # Swap the new snapshot in, then drop the previous one
+    previous = f"{output_dir}.old-{os.getpid()}"
+    if os.path.exists(output_dir):
+        os.replace(output_dir, previous)
+    os.replace(staging, output_dir)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(output_dir=EXPORT_DIR):
+    """
+    Read the manifest of the current snapshot.
+
+    Returns:
+        dict or None: None when no snapshot has been exported.
+    """
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=STORAGE_BACKEND, help="Where the data is read from")
+    parser.add_argument('--output-dir', default=EXPORT_DIR, help="Snapshot directory")
+    args = parser.parse_args(argv)
+
+    backend = get_backend(args.backend)
+    conn = backend.connect_readonly()
+    if conn is None:
+        raise ConnectionError(f"Could not connect to {backend.name}")
+    began = time.perf_counter()
+    try:
+        manifest = export_snapshot(conn, backend.dialect, args.output_dir)
+    finally:
+        conn.close()
+    print(f"Exported {len(manifest['locations'])} locations to {args.output_dir} in {time.perf_counter() - began:.2f}s")
+    if manifest['failed']:
+        print(f"Could not export: {', '.join(sorted(manifest['failed']))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import calendar
+import threading
+from collections import OrderedDict
+
+UNITS = {
+    'AQI': '', 'PM10': 'µg/m³', 'O3': 'ppb', 'PM2_5': 'µg/m³',
+    'CO': 'µg/m³', 'NO': 'µg/m³', 'NO2': 'µg/m³', 'SO2': 'µg/m³', 'NH3': 'µg/m³',
+}
+POLLUTANT_NAMES = {
+    'AQI': 'Air Quality Index',
+    'CO': 'Carbon monoxide',
+    'NO': 'Nitrogen monoxide',
+    'NO2': 'Nitrogen dioxide',
+    'O3': 'Ozone',
+    'SO2': 'Sulphur dioxide',
+    'PM2_5': 'Particulate Matter ≤ 2.5 microns',
+    'PM10': 'Particulate Matter ≤ 10 microns',
+    'NH3': 'Ammonia',
+}
+CUSTOM_COLOR_SCALE = ["green", "yellow", 'orange', "red", "purple"]
+
+
+def build_metric_figure(df_day, metric):
+    """
+    Build the hourly bar chart of one metric for one day.
+
+    Parameters:
+        df_day (pandas.DataFrame): Hourly rows of the day, with an HOUR column.
+        metric (str): Column to plot.
+
+    Returns:
+        plotly.graph_objects.Figure
+    """
+    # Plotly takes longer to import than the rest of the app, load it with the first chart
+    import plotly.express as px
+
+    units = UNITS.get(metric, '')
+    fig = px.bar(df_day, x='HOUR', y=metric, color=metric,
+                 color_continuous_scale=CUSTOM_COLOR_SCALE)
+
+    # Customizing layout and axis titles
+    fig.update_layout(
+        title=f"{metric} distribution over 24 hours",
+        xaxis_title="Hour of the day",
+        yaxis_title=f"{metric} ({units})",
+        plot_bgcolor='rgba(0, 0, 0, 0)',  # Making the background transparent
+        font=dict(
+            family="Courier New, monospace",
+            size=12,
+            color="#7f7f7f"
+        )
+    )
+
+    fig.update_xaxes(
+        ticktext=['12 AM', '2 AM', '4 AM', '6 AM', '8 AM', '10 AM', '12 PM', '2 PM', '4 PM', '6 PM', '8 PM', '10 PM'],
+        tickvals=[0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22],
+        tickangle=-45,
+        showgrid=False,  # Removing the gridlines
+        zeroline=False,  # Removing the x=0 line
+    )
+
+    fig.update_yaxes(
+        showgrid=False,  # Removing the gridlines
+        zeroline=False,  # Removing the y=0 line
+    )
+    return fig
+
+
+def build_heatmap_figure(table, metric):
+    """
+    Build the hour-of-day by month heatmap of one metric.
+
+    Parameters:
+        table (pandas.DataFrame): Mean per hour (rows) and month of the year (columns).
+        metric (str): Metric shown.
+
+    Returns:
+        plotly.graph_objects.Figure
+    """
+    import plotly.express as px
+
+    units = UNITS.get(metric, '')
+    months = [calendar.month_abbr[month] for month in table.columns]
+    fig = px.imshow(
+        table.to_numpy(), x=months, y=list(table.index), aspect='auto', origin='lower',
+        color_continuous_scale=CUSTOM_COLOR_SCALE, labels={'x': 'Month', 'y': 'Hour of the day', 'color': units or metric}
+    )
+    fig.update_layout(
+        title=f"Average {metric} by hour and month",
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        font=dict(
+            family="Courier New, monospace",
+            size=12,
+            color="#7f7f7f"
+        )
+    )
+    return fig
+
+
+class FigureCache:
+    """
+    Thread-safe LRU cache of built figures.
+
+    Keys should include the data version, so a new ETL load never serves a
+    stale chart; old versions simply age out.
+
+    Parameters:
+        max_entries (int): Figures kept before the least recently used is evicted.
+        stats (CacheStats or None): Counters to report calls and misses to, under 'figures'.
+    """
+
+    def __init__(self, max_entries=64, stats=None):
+        self.max_entries = max_entries
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._figures = OrderedDict()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached figure for `key`, building it with `build()` on a miss.
+
+        Parameters:
+            key (tuple): Hashable cache key, e.g. (day, metric, data version).
+            build (callable): Zero-argument function returning the figure.
+
+        Returns:
+            plotly.graph_objects.Figure
+        """
+        if self.stats is not None:
+            self.stats.call('figures')
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                return self._figures[key]
+        if self.stats is not None:
+            self.stats.miss('figures')
+        # Built outside the lock so concurrent viewers of other days are not serialized
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_URL = os.getenv('OWM_BASE_URL', 'http://api.openweathermap.org')
+LOCATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locations.json')
+GEOCODE_CACHE_FILE = os.getenv(
+    'GEOCODE_CACHE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geocode_cache.json')
+)
+# Coordinates of a city or zip code do not move, so cached entries never expire unless asked to
+GEOCODE_CACHE_MAX_AGE_DAYS = os.getenv('GEOCODE_CACHE_MAX_AGE_DAYS')
+
+# Free-tier accounts allow 60 calls a minute, so keep the default fan-out modest
+MAX_WORKERS = int(os.getenv('OWM_MAX_WORKERS', 8))
+REQUEST_TIMEOUT = 10
+
+logger = logging.getLogger(__name__)
+
+Location = namedtuple('Location', ['name', 'city', 'zip_code'])
+
+
+def load_locations(path=LOCATIONS_FILE):
+    """
+    Read the list of tracked locations.
+
+    Parameters:
+        path (str): JSON file holding a list of {"name", "city"} or {"name", "zip"} objects.
+
+    Returns:
+        list: Location tuples.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    return [Location(entry['name'], entry.get('city'), entry.get('zip')) for entry in entries]
+
+
+def describe_error(error):
+    """
+    Describe a failed API call without its message.
+
+    requests puts the request URL in its exception messages, and the URL
+    carries the API key in its query string, so only the exception type and
+    the HTTP status are kept.
+
+    Parameters:
+        error (Exception): The exception raised by the call.
+
+    Returns:
+        str
+    """
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return f"{type(error).__name__} (HTTP {status})" if status is not None else type(error).__name__
+
+
+def make_session(pool_size=MAX_WORKERS, retries=5, backoff_factor=0.5):
+    """
+    Create an HTTP session with a connection pool sized for the worker count.
+
+    Failed and rate-limited (429) calls are retried with exponential backoff,
+    honouring the Retry-After header when the API sends one.
+
+    Parameters:
+        pool_size (int): Maximum number of pooled connections per host.
+        retries (int): Maximum number of retries per call.
+        backoff_factor (float): Base delay of the exponential backoff, in seconds.
+
+    Returns:
+        requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class GeocodeCache:
+    """
+    Persistent city/zip -> (lat, lon) lookup backed by a JSON file.
+
+    Parameters:
+        path (str or None): JSON file to load from and save to, None for an in-memory cache.
+        max_age_days (float or None): Entries older than this are refetched, None to keep them forever.
+    """
+
+    def __init__(self, path=GEOCODE_CACHE_FILE, max_age_days=GEOCODE_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_s = float(max_age_days) * 86400 if max_age_days is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._entries = json.load(f)
+
+    @staticmethod
+    def key(city=None, zip_code=None):
+        return f'city:{city}' if city else f'zip:{zip_code}'
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (self.max_age_s is None or time.time() - entry['fetched_at'] < self.max_age_s):
+                self.hits += 1
+                return entry['lat'], entry['lon']
+            self.misses += 1
+            return None
+
+    def put(self, key, lat, lon):
+        with self._lock:
+            self._entries[key] = {'lat': lat, 'lon': lon, 'fetched_at': time.time()}
+            self._dirty = True
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def save(self):
+        """Write the cache back to disk if anything changed."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+class OpenWeatherMapClient:
+    """Thin wrapper over the geocoding, weather and air pollution endpoints."""
+
+    def __init__(self, api_key=None, session=None, base_url=BASE_URL, geocode_cache=None):
+        self.api_key = api_key if api_key is not None else os.getenv('API_KEY')
+        self.session = session or make_session()
+        self.base_url = base_url.rstrip('/')
+        self.geocode_cache = geocode_cache if geocode_cache is not None else GeocodeCache(path=None)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.geocode_calls = 0
+
+    def _get(self, path, **params):
+        with self._lock:
+            self.calls += 1
+        response = self.session.get(
+            f'{self.base_url}{path}', params={**params, 'appid': self.api_key}, timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_coordinates(self, city=None, zip_code=None):
+        key = GeocodeCache.key(city, zip_code)
+        cached = self.geocode_cache.get(key)
+        if cached is not None:
+            return cached
+        lat, lon = self._geocode(city, zip_code)
+        self.geocode_cache.put(key, lat, lon)
+        return lat, lon
+
+    def _geocode(self, city=None, zip_code=None):
+        with self._lock:
+            self.geocode_calls += 1
+        if city:
+            location_data = self._get('/geo/1.0/direct', q=city, limit=1)
+            return location_data[0]['lat'], location_data[0]['lon']
+        elif zip_code:
+            location_data = self._get('/geo/1.0/zip', zip=zip_code)
+            return location_data['lat'], location_data['lon']
+        else:
+            raise ValueError("Either a city or a zip code must be provided.")
+
+    def get_weather(self, lat, lon):
+        return self._get('/data/2.5/weather', lat=lat, lon=lon)
+
+    def get_air_pollution_forecast(self, lat, lon):
+        return self._get('/data/2.5/air_pollution/forecast', lat=lat, lon=lon)
+
+    def extract(self, location):
+        """
+        Fetch the current weather and the air pollution forecast for one location.
+
+        Parameters:
+            location (Location): Location to extract.
+
+        Returns:
+            dict: The location, its coordinates and both raw payloads.
+        """
+        lat, lon = self.get_coordinates(city=location.city, zip_code=location.zip_code)
+        return {
+            'location': location,
+            'lat': lat,
+            'lon': lon,
+            'weather': self.get_weather(lat, lon),
+            'air_pollution': self.get_air_pollution_forecast(lat, lon),
+        }
+
+
+def extract_locations(locations, client=None, max_workers=MAX_WORKERS):
+    """
+    Extract every location concurrently over one pooled session.
+
+    A location that still fails after the session's retries is reported and
+    skipped, so one bad entry does not abort the whole run.
+
+    Parameters:
+        locations (list): Location tuples.
+        client (OpenWeatherMapClient or None): Client to use, a new one by default.
+        max_workers (int): Maximum number of locations fetched at the same time.
+
+    Returns:
+        (list, dict): Results of extract() in input order, and {location name: exception} for failures.
+            Log the exceptions through describe_error(), their messages carry the API key.
+    """
+    client = client or OpenWeatherMapClient(session=make_session(pool_size=max_workers), geocode_cache=GeocodeCache())
+
+    def safe_extract(location):
+        try:
+            return client.extract(location), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        outcomes = list(pool.map(safe_extract, locations))
+    client.geocode_cache.save()
+    logger.debug(f"Geocode cache: {client.geocode_cache.hits} hits, {client.geocode_cache.misses} misses "
+                 f"({client.geocode_cache.hit_rate():.0%} hit rate)")
+
+    results, errors = [], {}
+    for location, (result, error) in zip(locations, outcomes):
+        if error is not None:
+            logger.warning(f"Error extracting {location.name}: {describe_error(error)}")
+            errors[location.name] = error
+        else:
+            results.append(result)
+    return results, errors
@@ -1,44 +1,19 @@
-import os
 import pandas as pd
-import snowflake.connector
 import streamlit as st
-from dotenv import load_dotenv
 from datetime import datetime
 
-# Load environment variables
-load_dotenv()
-
-# Connect to Snowflake DB
-def connect_to_snowflake():
-    return snowflake.connector.connect(
-        user=os.getenv('SNOWFLAKE_USER'),
-        password=os.getenv('SNOWFLAKE_PASSWORD'),
-        account=os.getenv('SNOWFLAKE_ACCOUNT'),
-        database=os.getenv('SNOWFLAKE_DATABASE'),
-        schema=os.getenv('SNOWFLAKE_SCHEMA')
-    )
+from data_access import BACKEND, get_cache_stats, get_refresher, load_table_stats
+from profiling import enabled as profiling_enabled, rerun
 
-# Fetch data from Snowflake
-def fetch_data(conn):
-    query = "SELECT * FROM AIR_QUALITY_DATA"
-    cursor = conn.cursor()
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    df = pd.DataFrame(rows, columns=[x[0] for x in cursor.description])
-    # Deduplicate records, keep only the most recent record
-    df = df.sort_values('RECORD_TIMESTAMP', ascending=False)
-    df = df.drop_duplicates(subset=['DATE'], keep='first')
-    
-    return df
-
-def compute_metrics(df):
-    # Compute the size of data in bytes
-    size_of_data = df.memory_usage().sum()
-    last_run_time = df['RECORD_TIMESTAMP'].max()
-    return size_of_data, last_run_time
+def compute_metrics(load_stats, storage_bytes):
+    # Table size comes from the warehouse metadata, the last run from the per-day aggregate
+    last_run_time = load_stats['LAST_RECORD'].max()
+    return storage_bytes, last_run_time
 
 def format_size(size):
-    # size is in bytes
+    # size is in bytes, None when the database does not report it
+    if size is None:
+        return "n/a"
     if size < 1024:
         return f"{size} bytes"
     elif size < 1024 ** 2:
@@ -63,28 +38,80 @@ def metadata_description():
         The regular updates to the data allow for monitoring trends over time and ensuring data quality.
         """)
 
-def main():
-    # Connect to database
-    conn = connect_to_snowflake()
+def display_cache_stats():
+    # Hit/miss counters of the shared data cache, aggregated over every viewer of this server
+    st.header("Cache Performance")
+    stats = get_cache_stats().snapshot()
+    if not stats:
+        st.write("No cache activity recorded yet.")
+        return
+    cache_df = pd.DataFrame(stats).T[['hits', 'misses', 'hit_rate']]
+    cache_df['hit_rate'] = cache_df['hit_rate'].map("{0:.1%}".format)
+    st.dataframe(cache_df)
+
+def display_refresh_metrics():
+    # State of the background refresher that reloads the served data after each ETL run
+    st.header("Background Refresh")
+    metrics = get_refresher().metrics()
+    col1, col2, col3, col4 = st.columns(4)
+    served = metrics['served_version']
+    col1.metric("Serving Data From", served.strftime('%m-%d %H:%M') if served is not None else "n/a")
+    col2.metric("Staleness", f"{metrics['staleness_s']:.0f} s")
+    latency = metrics['refresh_latency_s']
+    col3.metric("Last Refresh Latency", f"{latency:.2f} s" if latency is not None else "n/a")
+    col4.metric("Failed Refreshes", metrics['failures'])
+    last_check = metrics['last_check']
+    st.caption(
+        f"Last version check: {last_check:%m-%d %H:%M:%S}" if last_check is not None else "No version check yet."
+    )
+    if metrics['last_error']:
+        st.warning(f"Last refresh failed, serving the previous data: {metrics['last_error']}")
+    datasets = get_refresher().datasets()
+    if datasets:
+        st.dataframe(pd.DataFrame(datasets), hide_index=True)
+
+def display_profile_history(count=5):
+    # Per-step breakdown of this session's latest reruns, recorded when profiling is on
+    if not profiling_enabled():
+        return
+    st.header("Rerun Profile")
+    history = st.session_state.get('profile_history', [])
+    if not history:
+        st.write("No profiled rerun yet. Open a page to record one.")
+        return
+    for profile in reversed(history[-count:]):
+        label = f"{profile.page} at {profile.started:%H:%M:%S}: {profile.total_s:.3f} s"
+        with st.expander(label, expanded=profile is history[-1]):
+            steps_df = pd.DataFrame(profile.steps, columns=['step', 'depth', 'seconds', 'memory_delta_kb'])
+            steps_df['step'] = steps_df['depth'].map(lambda depth: '\u2003' * depth) + steps_df['step']
+            st.dataframe(steps_df.drop(columns='depth'), hide_index=True)
+            if profile.stats_file:
+                st.caption(f"cProfile stats: {profile.stats_file}")
 
-    # Fetch data
-    df = fetch_data(conn)
+def main():
+    # Fetch the per-day counts and table size through the shared cache
+    try:
+        load_stats, storage_bytes = load_table_stats()
+    except (ConnectionError, LookupError) as e:
+        print(f"Error loading table statistics: {e}")
+        st.error(f"ETL metrics are unavailable right now, {BACKEND.name} could not be reached.")
+        display_refresh_metrics()
+        return
 
     # Compute metrics
-    database_size, last_run_time = compute_metrics(df)
+    database_size, last_run_time = compute_metrics(load_stats, storage_bytes)
 
     # Compute data points added today
     today = datetime.now().date()
-    data_points_added_today = len(df[df['DATE'].dt.date == today])
+    data_points_added_today = int(load_stats.loc[load_stats['DAY'].dt.date == today, 'FORECAST_ROWS'].sum())
 
     # Compute number of days pulling data
-    first_data_date = df['DATE'].min().date()
+    first_data_date = load_stats['DAY'].min().date()
     days_pulling_data = (today - first_data_date).days
 
     # Compute the delta % changes
     delta_days_pulling_data = (days_pulling_data - (days_pulling_data - 1)) / (days_pulling_data - 1) * 100
     delta_data_points_added_today = (data_points_added_today - (data_points_added_today - 1)) / (data_points_added_today - 1) * 100
-    delta_database_size = (database_size - (database_size - 1)) / (database_size - 1) * 100
 
     # Display metrics on the dashboard
     st.header("ETL Metrics")
@@ -103,17 +130,23 @@ def main():
     with col4:
         st.metric("Total Days Running", days_pulling_data)
 
-    # Aggregate data by date and compute cumulative sum
-    df['DATE'] = pd.to_datetime(df['DATE']).dt.date
-    df_daily = df.groupby('DATE').size().reset_index(name='COUNT')
+    # Compute the cumulative sum of the per-day counts
+    df_daily = pd.DataFrame({'DATE': load_stats['DAY'].dt.date, 'COUNT': load_stats['FORECAST_ROWS']})
     df_daily['CUMULATIVE_COUNT'] = df_daily['COUNT'].cumsum()
 
     # Plot the data
     st.line_chart(df_daily.set_index('DATE')['CUMULATIVE_COUNT'])
 
+    display_cache_stats()
+
+    display_refresh_metrics()
+
+    display_profile_history()
+
     metadata_description()
 
 # Run the main function
 if __name__ == '__main__':
-    main()
+    with rerun('Metadata'):
+        main()
 
@@ -0,0 +1,81 @@
+import streamlit as st
+
+from aggregations import accuracy_by_lead_day
+from data_access import BACKEND, get_figure_cache, load_daily, load_forecast_accuracy, load_trends, select_location
+from database import POLLUTANT_COLUMNS
+from figures import POLLUTANT_NAMES, UNITS, build_heatmap_figure
+from profiling import profiled, rerun, timed
+
+@profiled()
+def display_rolling_means(trends, metric):
+    st.header("Rolling Averages")
+    st.line_chart(trends.rolling_means(metric))
+    st.caption(f"Daily mean {POLLUTANT_NAMES[metric]} and its {' and '.join(f'{w}-day' for w in trends.windows)} rolling means")
+
+@profiled()
+def display_percentiles(trends, metric):
+    st.header("Monthly Percentiles")
+    st.dataframe(trends.percentiles(metric).style.format("{0:.2f}"))
+    units = f" ({UNITS[metric]})" if UNITS[metric] else ""
+    st.caption(f"Percentiles of the hourly {metric} values of each month{units}")
+
+@profiled()
+def display_heatmap(trends, metric, location, data_version):
+    st.header("Hour of Day by Month")
+    with timed(f'figure heatmap {metric}'):
+        fig = get_figure_cache().get_or_build(
+            (location, 'heatmap', metric, data_version), lambda: build_heatmap_figure(trends.heatmap(metric), metric)
+        )
+    st.plotly_chart(fig)
+
+@profiled()
+def display_forecast_accuracy(location, metric):
+    st.header("Forecast Accuracy")
+    try:
+        accuracy = load_forecast_accuracy(location)
+    except LookupError:
+        st.write("No superseded forecasts archived yet, accuracy is measured once forecasts have been revised.")
+        return
+    by_day = accuracy_by_lead_day(accuracy, [metric])
+    by_day = by_day.rename(columns={'PAIRS': 'Forecasts compared', f'{metric}_MAE': 'Mean absolute error', f'{metric}_BIAS': 'Bias'})
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.line_chart(by_day[['Mean absolute error', 'Bias']])
+    with col2:
+        st.dataframe(by_day.style.format({'Mean absolute error': "{0:.2f}", 'Bias': "{0:+.2f}"}))
+    st.caption(
+        f"Error of earlier forecasts of {metric} against the latest forecast of the same hour, "
+        "by days between the forecast and the hour forecast"
+    )
+
+def main():
+    st.write("# Air Quality Trends")
+    try:
+        location = select_location(sorted(load_daily()['LOCATION'].dropna().astype(str).unique()))
+        metric = st.sidebar.selectbox('Pollutant', options=POLLUTANT_COLUMNS, format_func=lambda p: f"{p} ({POLLUTANT_NAMES[p]})")
+        trends, data_version = load_trends(location)
+    except (ConnectionError, LookupError) as e:
+        print(f"Error loading trend data: {e}")
+        st.error(f"Trend data is unavailable right now, {BACKEND.name} could not be reached. Please try again later.")
+        return
+
+    if location is not None:
+        st.write(f"Forecast history of **{location}**, {len(trends.daily_means)} days")
+
+    display_rolling_means(trends, metric)
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        display_percentiles(trends, metric)
+    with col2:
+        display_heatmap(trends, metric, location, data_version)
+
+    try:
+        display_forecast_accuracy(location, metric)
+    except ConnectionError as e:
+        print(f"Error loading forecast accuracy: {e}")
+        st.error(f"Forecast accuracy is unavailable right now, {BACKEND.name} could not be reached.")
+
+# Run the main function
+if __name__ == '__main__':
+    with rerun('Trends'):
+        main()
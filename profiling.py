@@ -0,0 +1,159 @@
+import cProfile
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+# Opt-in: PROFILE_APP=1 for every session, or ?profile=1 in the URL for one session
+PROFILE_APP = os.getenv('PROFILE_APP', '').lower() in ('1', 'true', 'yes')
+# When set, each profiled rerun also writes cProfile stats to this directory
+PROFILE_DUMP_DIR = os.getenv('PROFILE_DUMP_DIR')
+# Reruns kept per session for the breakdown panel
+PROFILE_HISTORY = 20
+
+# Streamlit runs each rerun of a session on its own script thread
+_current = threading.local()
+# tracemalloc is process-wide and slows every session while it runs, so it only
+# runs while at least one profiled rerun is in progress
+_tracing_lock = threading.Lock()
+_tracing_reruns = 0
+_started_tracing = False
+
+
+class RerunProfile:
+    """Timings and memory deltas of the steps of one script rerun, in call order."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = datetime.now()
+        self.total_s = None
+        self.stats_file = None
+        self.steps = []
+        self._depth = 0
+
+    def start_step(self, name):
+        step = {'step': name, 'depth': self._depth, 'seconds': None, 'memory_delta_kb': None}
+        self.steps.append(step)
+        self._depth += 1
+        return step
+
+    def end_step(self, step, seconds, memory_delta):
+        self._depth -= 1
+        step['seconds'] = round(seconds, 4)
+        step['memory_delta_kb'] = round(memory_delta / 1024, 1)
+
+
+def _start_tracing():
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        if _tracing_reruns == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_reruns += 1
+
+
+def _stop_tracing():
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        _tracing_reruns -= 1
+        # Tracing started outside the app (python -X tracemalloc) is left running
+        if _tracing_reruns == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def enabled():
+    """
+    Whether the current session is profiled.
+
+    The query parameter is remembered in session state, so the other pages of
+    the app stay profiled after navigating away from the URL that enabled it.
+
+    Returns:
+        bool
+    """
+    if PROFILE_APP:
+        return True
+    if st.query_params.get('profile', '').lower() in ('1', 'true', 'yes'):
+        st.session_state['profiling'] = True
+    return st.session_state.get('profiling', False)
+
+
+@contextmanager
+def timed(name):
+    """
+    Record the duration and traced memory delta of a block in the current rerun's profile.
+
+    Does nothing when the rerun is not profiled, so call sites can stay in place.
+    The memory delta is process-wide, so it includes the allocations of any
+    other session rerunning at the same time.
+
+    Parameters:
+        name (str): Step name shown in the breakdown.
+    """
+    profile = getattr(_current, 'profile', None)
+    if profile is None:
+        yield
+        return
+    step = profile.start_step(name)
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.end_step(step, time.perf_counter() - start, tracemalloc.get_traced_memory()[0] - memory_before)
+
+
+def profiled(name=None):
+    """Decorator form of timed(), named after the function by default."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def rerun(page):
+    """
+    Profile one rerun of a page when profiling is enabled for the session.
+
+    The finished profile is appended to st.session_state['profile_history'].
+
+    Parameters:
+        page (str): Page name shown in the breakdown.
+
+    Yields:
+        RerunProfile or None: None when profiling is off.
+    """
+    if not enabled():
+        yield None
+        return
+    _start_tracing()
+    profile = RerunProfile(page)
+    profiler = cProfile.Profile() if PROFILE_DUMP_DIR else None
+    _current.profile = profile
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        _stop_tracing()
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DUMP_DIR, exist_ok=True)
+            profile.stats_file = os.path.join(PROFILE_DUMP_DIR, f"{page}-{profile.started:%Y%m%d-%H%M%S-%f}.prof")
+            profiler.dump_stats(profile.stats_file)
+        profile.total_s = round(time.perf_counter() - start, 4)
+        _current.profile = None
+        history = st.session_state.setdefault('profile_history', [])
+        history.append(profile)
+        del history[:-PROFILE_HISTORY]
@@ -0,0 +1,217 @@
+import threading
+import time
+from datetime import datetime
+
+
+class Refresher:
+    """
+    Datasets held in memory and reloaded by a background thread after each ETL run.
+
+    Reads are stale-while-revalidate: once a dataset is loaded, reads return
+    the last good value immediately while the thread polls the data version
+    and reloads every dataset when it changes. Each dataset that reloads is
+    applied on its own: one that fails keeps its last good value and is
+    retried at the next check, so a warehouse outage leaves the last good
+    snapshot in place. A dataset whose loader raises LookupError no longer
+    has any rows and is dropped, its next read loads it again.
+
+    Parameters:
+        check_version (callable): Zero-argument function returning the current data version,
+            raising when it cannot be read.
+        interval (float): Seconds between version checks.
+        idle_after (float or None): Datasets not read for this many seconds are dropped
+            instead of reloaded, kept forever when None.
+        stats (CacheStats or None): Counters to report reads and synchronous loads to,
+            under the first item of each dataset key.
+        on_evict (callable or None): Called with the key of each dataset dropped, to release
+            what its loader holds outside the refresher.
+    """
+
+    def __init__(self, check_version, interval, idle_after=None, stats=None, on_evict=None):
+        self.check_version = check_version
+        self.interval = interval
+        self.idle_after = idle_after
+        self.stats = stats
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        # One reload at a time, whether started by the thread or by refresh()
+        self._refresh_lock = threading.Lock()
+        self._entries = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # Version of the data being served, and the newest one seen in the warehouse
+        self.version = None
+        self.latest_version = None
+        self.behind_since = None
+        self.last_check = None
+        self.last_refresh = None
+        self.refresh_latency_s = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def start(self):
+        """Start the background thread, once."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def get(self, key, loader):
+        """
+        Return the last good value of a dataset, loading it on its first read.
+
+        Parameters:
+            key (tuple): Hashable dataset key, its first item names the dataset in the stats.
+            loader (callable): Zero-argument function returning the dataset, raising on failure.
+
+        Returns:
+            (object, object): The value and the data version it was loaded at.
+        """
+        if self.stats is not None:
+            self.stats.call(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['last_read'] = time.monotonic()
+                return entry['value'], entry['version']
+        if self.stats is not None:
+            self.stats.miss(key[0])
+        # Nothing to serve yet, so the first read of a dataset waits for it
+        version = self.version
+        began = time.perf_counter()
+        value = loader()
+        entry = {
+            'loader': loader, 'value': value, 'version': version, 'loaded_at': datetime.now(),
+            'latency_s': time.perf_counter() - began, 'last_read': time.monotonic(),
+        }
+        with self._lock:
+            entry = self._entries.setdefault(key, entry)
+            return entry['value'], entry['version']
+
+    def refresh(self):
+        """
+        Check the data version and reload the datasets loaded at an older one.
+
+        Failures are recorded in the metrics and never raised, the previous
+        values of the datasets that failed keep being served.
+
+        Returns:
+            bool: Whether every dataset is now at the latest version.
+        """
+        with self._refresh_lock:
+            try:
+                latest = self.check_version()
+            except Exception as e:
+                return self._failed(e)
+            now = datetime.now()
+            idle = []
+            with self._lock:
+                self.last_check = now
+                self.latest_version = latest
+                if self.idle_after is not None:
+                    idle_before = time.monotonic() - self.idle_after
+                    idle = [key for key, entry in self._entries.items() if entry['last_read'] < idle_before]
+                    for key in idle:
+                        del self._entries[key]
+                stale = {key: entry for key, entry in self._entries.items() if entry['version'] != latest}
+                current = latest == self.version and not stale
+                if not current and self.behind_since is None:
+                    self.behind_since = now
+            self._evicted(idle)
+            if current:
+                return False
+
+            began = time.perf_counter()
+            reloaded, emptied, error = {}, [], None
+            for key, entry in stale.items():
+                loaded = time.perf_counter()
+                try:
+                    value = entry['loader']()
+                except LookupError:
+                    emptied.append(key)
+                    continue
+                except Exception as e:
+                    error = e
+                    continue
+                reloaded[key] = {
+                    **entry, 'value': value, 'version': latest, 'loaded_at': datetime.now(),
+                    'latency_s': time.perf_counter() - loaded,
+                }
+
+            with self._lock:
+                for key, entry in reloaded.items():
+                    # Keep the read time of the entry being replaced, it may have been read meanwhile
+                    if key in self._entries:
+                        entry['last_read'] = self._entries[key]['last_read']
+                    self._entries[key] = entry
+                for key in emptied:
+                    self._entries.pop(key, None)
+            self._evicted(emptied)
+            if error is not None:
+                # The datasets still at an older version are retried at the next check
+                return self._failed(error)
+
+            with self._lock:
+                self.version = latest
+                self.behind_since = None
+                self.last_refresh = datetime.now()
+                self.refresh_latency_s = time.perf_counter() - began
+                self.refreshes += 1
+                self.last_error = None
+            return True
+
+    def _evicted(self, keys):
+        if self.on_evict is not None:
+            for key in keys:
+                self.on_evict(key)
+
+    def _failed(self, error):
+        print(f"Error refreshing data: {error}")
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+        return False
+
+    def metrics(self):
+        """
+        Summarize the refresher's state.
+
+        Returns:
+            dict: Versions, staleness (seconds the served data has been behind a newer
+                version, 0 when current), the latency of the last reload and failure counts.
+        """
+        with self._lock:
+            now = datetime.now()
+            return {
+                'datasets': len(self._entries),
+                'served_version': self.version,
+                'latest_version': self.latest_version,
+                'staleness_s': (now - self.behind_since).total_seconds() if self.behind_since else 0.0,
+                'last_check': self.last_check,
+                'last_refresh': self.last_refresh,
+                'refresh_latency_s': self.refresh_latency_s,
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'last_error': self.last_error,
+            }
+
+    def datasets(self):
+        """
+        Describe each dataset held.
+
+        Returns:
+            list: {'dataset', 'version', 'loaded_at', 'latency_s'} per dataset.
+        """
+        with self._lock:
+            return [
+                {'dataset': ' / '.join(str(part) for part in key if part is not None), 'version': entry['version'],
+                 'loaded_at': entry['loaded_at'], 'latency_s': round(entry['latency_s'], 4)}
+                for key, entry in self._entries.items()
+            ]
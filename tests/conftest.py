@@ -0,0 +1,28 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The modules live at the project root, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DUCKDB, SQLITE  # noqa: E402
+from etl import create_tables  # noqa: E402
+
+
+def _duckdb_connection():
+    duckdb = pytest.importorskip('duckdb')
+    return duckdb.connect()
+
+
+@pytest.fixture(params=['sqlite', 'duckdb'])
+def backend(request):
+    """An empty database with every table created, as (connection, dialect)."""
+    if request.param == 'sqlite':
+        conn, dialect = sqlite3.connect(':memory:'), SQLITE
+    else:
+        conn, dialect = _duckdb_connection(), DUCKDB
+    create_tables(conn, dialect)
+    yield conn, dialect
+    conn.close()
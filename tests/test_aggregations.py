@@ -0,0 +1,20 @@
+import pandas as pd
+
+from aggregations import daily_rollup, worst_days
+from benchmarks.synthetic import generate_batch
+
+
+def test_worst_days_picks_the_day_with_the_highest_mean():
+    daily = daily_rollup(generate_batch(pd.Timestamp('2024-06-01'), hours=96))
+    daily.loc[daily['DAY'] == pd.Timestamp('2024-06-03'), 'AQI_MEAN'] = 100
+
+    worst = worst_days(daily, pd.Timestamp('2024-06-02'))
+
+    assert list(worst.index) == ['AQI', 'PM10', 'O3', 'PM2_5']
+    assert worst['AQI'] == pd.Timestamp('2024-06-03')
+
+
+def test_worst_days_of_a_location_no_longer_forecast_is_empty():
+    daily = daily_rollup(generate_batch(pd.Timestamp('2024-06-01'), hours=48))
+
+    assert worst_days(daily, pd.Timestamp('2024-06-10')).empty
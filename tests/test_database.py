@@ -0,0 +1,61 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_batch
+from database import fetch_data, merge_latest
+from etl import load_air_quality
+
+
+def batch(run_timestamp, location='Phoenix', hours=24, aqi=1):
+    df = generate_batch(run_timestamp, hours=hours)
+    return df.assign(LOCATION=location, AQI=aqi)
+
+
+def test_merge_latest_keeps_the_newest_version_per_location_and_date():
+    run = pd.Timestamp('2024-06-01 06:00')
+    snapshot = pd.concat([batch(run, 'Phoenix', aqi=1), batch(run, 'Tempe', aqi=2)], ignore_index=True)
+    # A later run revises the last 12 hours of Phoenix only
+    new_rows = batch(run + pd.Timedelta(hours=12), 'Phoenix', hours=12, aqi=5)
+
+    merged = merge_latest(snapshot, new_rows)
+
+    assert not merged.duplicated(['LOCATION', 'DATE']).any()
+    assert len(merged) == 24 + 24
+    phoenix = merged[merged['LOCATION'] == 'Phoenix'].set_index('DATE')['AQI']
+    assert (phoenix[phoenix.index >= run + pd.Timedelta(hours=12)] == 5).all()
+    assert (phoenix[phoenix.index < run + pd.Timedelta(hours=12)] == 1).all()
+    assert (merged.loc[merged['LOCATION'] == 'Tempe', 'AQI'] == 2).all()
+    assert merged[['LOCATION', 'DATE']].equals(merged.sort_values(['LOCATION', 'DATE'])[['LOCATION', 'DATE']])
+
+
+def test_merge_latest_prefers_incoming_rows_on_a_timestamp_tie():
+    run = pd.Timestamp('2024-06-01 06:00')
+    merged = merge_latest(batch(run, aqi=1), batch(run, aqi=4))
+    assert len(merged) == 24
+    assert (merged['AQI'] == 4).all()
+
+
+def test_merge_latest_drops_rows_before_start():
+    run = pd.Timestamp('2024-06-01 00:00')
+    start = run + pd.Timedelta(hours=6)
+    merged = merge_latest(batch(run), batch(run + pd.Timedelta(days=1), hours=1), start=start)
+    assert merged['DATE'].min() == start
+    assert len(merged) == 18 + 1
+
+
+def test_merge_latest_without_new_rows_returns_the_snapshot():
+    snapshot = batch(pd.Timestamp('2024-06-01'))
+    merged = merge_latest(snapshot, snapshot.iloc[0:0])
+    assert merged['AQI'].tolist() == snapshot['AQI'].tolist()
+    assert merged['DATE'].tolist() == snapshot['DATE'].tolist()
+
+
+def test_fetch_data_projection_without_the_key_columns(backend):
+    conn, dialect = backend
+    load_air_quality(conn, batch(pd.Timestamp('2024-06-01 06:00'), aqi=1), dialect)
+    load_air_quality(conn, batch(pd.Timestamp('2024-06-02 06:00'), hours=6, aqi=3), dialect)
+
+    df = fetch_data(conn, columns=['AQI'], dialect=dialect)
+
+    assert list(df.columns) == ['AQI']
+    assert len(df) == 30
+    assert df['AQI'].tolist() == [1] * 24 + [3] * 6
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_batch, generate_history
+from database import AIR_QUALITY_ARCHIVE_TABLE, AIR_QUALITY_COLUMNS, AIR_QUALITY_TABLE, SQLITE, fetch_data
+from etl import compact, create_tables, frame_to_rows, insert_air_quality_sql, load_air_quality, replicate
+
+
+def count(conn, table, where=''):
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM {table} {where}")
+    return cur.fetchone()[0]
+
+
+def insert_raw(conn, dialect, df):
+    """Append rows without the loader's upsert, like history written before it existed."""
+    cur = conn.cursor()
+    cur.executemany(insert_air_quality_sql(dialect), frame_to_rows(df[AIR_QUALITY_COLUMNS]))
+    conn.commit()
+
+
+def test_load_air_quality_is_idempotent(backend):
+    conn, dialect = backend
+    batch = generate_batch(pd.Timestamp('2024-06-01 06:00'), hours=96)
+
+    assert load_air_quality(conn, batch, dialect) == 96
+    first = fetch_data(conn, dialect=dialect)
+    assert load_air_quality(conn, batch, dialect) == 96
+
+    assert count(conn, AIR_QUALITY_TABLE) == 96
+    # The replaced copy is archived, not lost
+    assert count(conn, AIR_QUALITY_ARCHIVE_TABLE) == 96
+    assert fetch_data(conn, dialect=dialect).equals(first)
+
+
+def test_load_air_quality_replaces_the_overlap_of_its_own_location_only(backend):
+    conn, dialect = backend
+    run = pd.Timestamp('2024-06-01 06:00')
+    load_air_quality(conn, generate_batch(run, hours=48).assign(LOCATION='Phoenix', AQI=1), dialect)
+    load_air_quality(conn, generate_batch(run, hours=48).assign(LOCATION='Tempe', AQI=1), dialect)
+
+    # The next run starts 24 hours later and revises the second day of Phoenix
+    load_air_quality(conn, generate_batch(run + pd.Timedelta(hours=24), hours=48).assign(LOCATION='Phoenix', AQI=5), dialect)
+
+    df = fetch_data(conn, dialect=dialect)
+    assert not df.duplicated(['LOCATION', 'DATE']).any()
+    phoenix = df[df['LOCATION'] == 'Phoenix']
+    assert len(phoenix) == 72
+    assert (phoenix.loc[phoenix['DATE'] < run + pd.Timedelta(hours=24), 'AQI'] == 1).all()
+    assert (phoenix.loc[phoenix['DATE'] >= run + pd.Timedelta(hours=24), 'AQI'] == 5).all()
+    assert (df.loc[df['LOCATION'] == 'Tempe', 'AQI'] == 1).all()
+    assert count(conn, AIR_QUALITY_TABLE) == 72 + 48
+    assert count(conn, AIR_QUALITY_TABLE, "WHERE LOCATION = 'Tempe'") == 48
+    assert count(conn, AIR_QUALITY_ARCHIVE_TABLE) == 24
+
+
+def test_compact_archives_superseded_rows_without_changing_the_latest(backend):
+    conn, dialect = backend
+    history = generate_history(days=5, locations=2, reforecasts=3)
+    insert_raw(conn, dialect, history)
+    latest = fetch_data(conn, dialect=dialect)
+    stored = count(conn, AIR_QUALITY_TABLE)
+
+    result = compact(conn, dialect)
+
+    assert result == {'archived': stored - len(latest), 'purged': 0}
+    assert count(conn, AIR_QUALITY_TABLE) == len(latest)
+    assert count(conn, AIR_QUALITY_ARCHIVE_TABLE) == stored - len(latest)
+    assert fetch_data(conn, dialect=dialect).equals(latest)
+    # Nothing is left to archive
+    assert compact(conn, dialect)['archived'] == 0
+
+
+def test_compact_purges_archived_forecasts_past_retention(backend):
+    conn, dialect = backend
+    now = pd.Timestamp.now().floor('h')
+    insert_raw(conn, dialect, generate_batch(now - pd.Timedelta(days=30), hours=24))
+    insert_raw(conn, dialect, generate_batch(now - pd.Timedelta(days=30, hours=-1), hours=24))
+    insert_raw(conn, dialect, generate_batch(now - pd.Timedelta(days=2), hours=24))
+    insert_raw(conn, dialect, generate_batch(now - pd.Timedelta(days=2, hours=-1), hours=24))
+
+    result = compact(conn, dialect, archive_retention_days=7)
+
+    # Each older run lost 23 of its hours to the next one; only the month-old ones are purged
+    assert result == {'archived': 46, 'purged': 23}
+    assert count(conn, AIR_QUALITY_ARCHIVE_TABLE) == 23
+
+
+def test_replicate_copies_the_archive_with_the_latest_forecasts(backend):
+    conn, dialect = backend
+    source = sqlite3.connect(':memory:')
+    create_tables(source, SQLITE)
+    insert_raw(source, SQLITE, generate_history(days=5, locations=2, reforecasts=3))
+    compact(source, SQLITE)
+    # A replica seeded before holds rows the copy replaces
+    load_air_quality(conn, generate_batch(pd.Timestamp('2024-06-01 06:00')), dialect)
+
+    copied = replicate(source, conn, dialect, batch_rows=100)
+
+    assert copied == {
+        AIR_QUALITY_TABLE: count(source, AIR_QUALITY_TABLE), AIR_QUALITY_ARCHIVE_TABLE: count(source, AIR_QUALITY_ARCHIVE_TABLE)
+    }
+    assert count(conn, AIR_QUALITY_TABLE) == count(source, AIR_QUALITY_TABLE)
+    assert count(conn, AIR_QUALITY_ARCHIVE_TABLE) == count(source, AIR_QUALITY_ARCHIVE_TABLE) > 0
+    pd.testing.assert_frame_equal(fetch_data(conn, dialect=dialect), fetch_data(source, dialect=SQLITE), check_dtype=False)
@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+import export
+from benchmarks.synthetic import generate_batch
+from etl import load_air_quality
+from export import export_snapshot, read_manifest
+
+
+@pytest.fixture
+def two_locations(backend):
+    conn, dialect = backend
+    run = pd.Timestamp.now().floor('h') - pd.Timedelta(days=1)
+    load_air_quality(conn, generate_batch(run).assign(LOCATION='Phoenix'), dialect)
+    # Tempe stopped being forecast three days ago
+    load_air_quality(conn, generate_batch(run - pd.Timedelta(days=6)).assign(LOCATION='Tempe'), dialect)
+    return conn, dialect
+
+
+def test_export_snapshot_renders_a_location_no_longer_forecast(two_locations, tmp_path):
+    conn, dialect = two_locations
+
+    manifest = export_snapshot(conn, dialect, str(tmp_path / 'snapshot'))
+
+    assert [entry['name'] for entry in manifest['locations']] == ['Phoenix', 'Tempe']
+    assert manifest['failed'] == {}
+
+
+def test_export_snapshot_skips_a_location_that_fails(two_locations, tmp_path, monkeypatch):
+    conn, dialect = two_locations
+    output_dir = str(tmp_path / 'snapshot')
+    render_location = export.render_location
+
+    def failing_render(location, *args):
+        if location == 'Tempe':
+            raise ValueError("cannot render")
+        return render_location(location, *args)
+
+    monkeypatch.setattr(export, 'render_location', failing_render)
+    manifest = export_snapshot(conn, dialect, output_dir)
+
+    assert [entry['name'] for entry in manifest['locations']] == ['Phoenix']
+    assert manifest['failed'] == {'Tempe': 'ValueError: cannot render'}
+    assert read_manifest(output_dir) == manifest
+    assert os.path.exists(os.path.join(output_dir, manifest['locations'][0]['page']))
+
+
+def test_export_snapshot_keeps_the_previous_snapshot_when_every_location_fails(two_locations, tmp_path, monkeypatch):
+    conn, dialect = two_locations
+    output_dir = str(tmp_path / 'snapshot')
+    previous = export_snapshot(conn, dialect, output_dir)
+
+    def failing_render(*args):
+        raise ValueError("cannot render")
+
+    monkeypatch.setattr(export, 'render_location', failing_render)
+    with pytest.raises(RuntimeError):
+        export_snapshot(conn, dialect, output_dir)
+
+    assert read_manifest(output_dir) == previous
+    assert os.listdir(tmp_path) == ['snapshot']
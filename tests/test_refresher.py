@@ -0,0 +1,71 @@
+from refresher import Refresher
+
+
+class Warehouse:
+    """Version and rows per location the loaders read, changed by each test between refreshes."""
+
+    def __init__(self):
+        self.version = 1
+        self.rows = {'Phoenix': 'phoenix v1', 'Tempe': 'tempe v1'}
+        self.unreachable = set()
+
+    def loader(self, location):
+        def load():
+            if location in self.unreachable:
+                raise ConnectionError("unreachable")
+            if location not in self.rows:
+                raise LookupError("No air quality data returned")
+            return self.rows[location]
+        return load
+
+
+def make_refresher(warehouse, **kwargs):
+    refresher = Refresher(lambda: warehouse.version, interval=60, **kwargs)
+    refresher.refresh()
+    for location in ('Phoenix', 'Tempe'):
+        refresher.get(('air_quality', location), warehouse.loader(location))
+    return refresher
+
+
+def test_refresh_drops_a_dataset_that_emptied_and_reloads_the_others():
+    warehouse = Warehouse()
+    evicted = []
+    refresher = make_refresher(warehouse, on_evict=evicted.append)
+
+    warehouse.version = 2
+    warehouse.rows = {'Phoenix': 'phoenix v2'}
+    assert refresher.refresh()
+
+    assert refresher.version == 2
+    assert refresher.get(('air_quality', 'Phoenix'), warehouse.loader('Phoenix')) == ('phoenix v2', 2)
+    assert [entry['dataset'] for entry in refresher.datasets()] == ['air_quality / Phoenix']
+    assert evicted == [('air_quality', 'Tempe')]
+
+
+def test_refresh_keeps_the_last_good_value_of_a_dataset_that_failed():
+    warehouse = Warehouse()
+    refresher = make_refresher(warehouse)
+    warehouse.unreachable = {'Tempe'}
+    warehouse.version = 2
+    warehouse.rows = {'Phoenix': 'phoenix v2', 'Tempe': 'tempe v2'}
+    assert not refresher.refresh()
+
+    assert refresher.failures == 1
+    assert refresher.get(('air_quality', 'Phoenix'), warehouse.loader('Phoenix')) == ('phoenix v2', 2)
+    assert refresher.get(('air_quality', 'Tempe'), warehouse.loader('Tempe')) == ('tempe v1', 1)
+
+    # The next check retries the dataset still behind
+    warehouse.unreachable = set()
+    assert refresher.refresh()
+    assert refresher.get(('air_quality', 'Tempe'), warehouse.loader('Tempe')) == ('tempe v2', 2)
+
+
+def test_refresh_drops_idle_datasets():
+    warehouse = Warehouse()
+    evicted = []
+    refresher = make_refresher(warehouse, idle_after=0, on_evict=evicted.append)
+
+    assert not refresher.refresh()
+
+    assert refresher.datasets() == []
+    assert sorted(evicted) == [('air_quality', 'Phoenix'), ('air_quality', 'Tempe')]